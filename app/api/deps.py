@@ -0,0 +1,15 @@
+
+from fastapi import Depends, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import UserRead
+from app.db.replicas import replica_set, written_version
+from app.helper.auth import get_current_user
+
+
+# Session for the read-only endpoints: a read replica, or the primary while the user's own write
+# may not have reached the replicas yet
+async def get_read_db(request: Request, current_user: UserRead = Depends(get_current_user)):
+    read_engine = await replica_set.engine_for(current_user.id, written_version(request, current_user.id))
+    async with AsyncSession(read_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,179 @@
+
+# Bulk todo operations: create, patch, complete or delete many todos in one request.
+# Each request runs one ownership query, batched INSERT/UPDATE/DELETE statements and a single commit,
+# and returns one result per item with the status the single-item endpoint would have used.
+# The changes of one request are pushed to the owner's WebSocket connections as a single todo_batch event.
+
+from typing import Dict, List, Tuple
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import delete, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.helper.auth import get_current_user
+from app.helper.broadcast import send_todo_event
+from app.helper.todo_events import (
+    todo_batch_event,
+    todo_created_event,
+    todo_deleted_event,
+    todo_updated_event,
+)
+from app.helper.todo_queries import TODO_COLUMNS
+from app.helper.todo_versions import bump_todos_version
+from app.db.database import get_db
+from app.db.models import Todo, TodoBulkCreate, TodoBulkIds, TodoBulkResult, TodoBulkUpdate, TodoRead, UserRead
+
+
+router = APIRouter(prefix="/todos", tags=["todos"])
+
+
+# Load the requested todos with one query and split them into owned rows and per-item errors
+async def check_ownership(
+    db: AsyncSession, ids: List[int], user_id: int, action: str
+) -> Tuple[Dict[int, dict], Dict[int, TodoBulkResult]]:
+    statement = select(*TODO_COLUMNS).where(Todo.id.in_(set(ids)))
+    rows = {row.id: dict(row._mapping) for row in (await db.exec(statement)).all()}
+
+    owned, errors = {}, {}
+    for todo_id in ids:
+        row = rows.get(todo_id)
+        if row is None:
+            errors[todo_id] = TodoBulkResult(id=todo_id, status=404, detail="Todo not found")
+        elif row["user_id"] != user_id:
+            errors[todo_id] = TodoBulkResult(id=todo_id, status=403, detail=f"Not authorized to {action} this todo")
+        else:
+            owned[todo_id] = row
+    return owned, errors
+
+
+#create many todos
+@router.post("/bulk", response_model=List[TodoBulkResult])
+async def create_todos_bulk(
+    bulk: TodoBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    values = [dict(todo.dict(), user_id=current_user.id) for todo in bulk.items]
+    if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = insert(Todo).returning(*TODO_COLUMNS, sort_by_parameter_order=True)
+        rows = [row._asdict() for row in (await db.execute(statement, values)).all()]
+    else:
+        # Fallback for backends without INSERT ... RETURNING, the ORM inserts row by row to learn the ids
+        todos = [Todo(**value) for value in values]
+        db.add_all(todos)
+        await db.flush()
+        rows = [{column.key: getattr(todo, column.key) for column in TODO_COLUMNS} for todo in todos]
+    seq = await bump_todos_version(db, current_user.id, total=len(rows), done=sum(row["done"] for row in rows))
+    await db.commit()
+    await send_todo_event(current_user.id, seq, todo_batch_event([todo_created_event(row) for row in rows]))
+    return [TodoBulkResult(id=row["id"], status=201, todo=TodoRead(**row)) for row in rows]
+
+
+#update many todos, each item carries its own id and changed fields
+@router.patch("/bulk", response_model=List[TodoBulkResult])
+async def edit_todos_bulk(
+    bulk: TodoBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    owned, errors = await check_ownership(db, [item.id for item in bulk.items], current_user.id, "update")
+
+    changes = []
+    # Format: {todo_id: done}, the status each todo ends up with
+    new_done = {}
+    for item in bulk.items:
+        if item.id not in owned:
+            continue
+        todo_data = item.dict(exclude_unset=True, exclude={"id"})
+        if todo_data:
+            if "done" in todo_data:
+                new_done[item.id] = todo_data["done"]
+            owned[item.id].update(todo_data)
+            changes.append({"id": item.id, **todo_data})
+
+    if changes:
+        # Only the todos whose status actually flips are counted, like in mark_todos_as_completed_bulk
+        done = 0
+        for status, sign in ((True, 1), (False, -1)):
+            ids = [todo_id for todo_id, value in new_done.items() if value == status]
+            if ids:
+                statement = (
+                    update(Todo)
+                    .where(Todo.id.in_(ids), Todo.user_id == current_user.id, Todo.done != status)
+                    .values(done=status)
+                    .execution_options(synchronize_session=False)
+                )
+                done += sign * (await db.execute(statement)).rowcount
+        # ORM bulk UPDATE by primary key, rows with the same changed fields share one executemany
+        await db.execute(update(Todo), changes)
+        seq = await bump_todos_version(db, current_user.id, done=done)
+    await db.commit()
+    if changes:
+        events = [todo_updated_event(change.pop("id"), change) for change in changes]
+        await send_todo_event(current_user.id, seq, todo_batch_event(events))
+
+    return [
+        errors[item.id] if item.id in errors
+        else TodoBulkResult(id=item.id, status=200, todo=TodoRead(**owned[item.id]))
+        for item in bulk.items
+    ]
+
+
+#mark many todos as completed
+@router.patch("/bulk/complete", response_model=List[TodoBulkResult])
+async def mark_todos_as_completed_bulk(
+    bulk: TodoBulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    owned, errors = await check_ownership(db, bulk.ids, current_user.id, "update")
+
+    if owned:
+        statement = (
+            update(Todo)
+            .where(Todo.id.in_(list(owned)), Todo.user_id == current_user.id, Todo.done == False)
+            .values(done=True)
+            .execution_options(synchronize_session=False)
+        )
+        # Todos that were already done are not counted again
+        completed = (await db.execute(statement)).rowcount
+        seq = await bump_todos_version(db, current_user.id, done=completed)
+    await db.commit()
+    if owned:
+        events = [todo_updated_event(todo_id, {"done": True}) for todo_id in owned]
+        await send_todo_event(current_user.id, seq, todo_batch_event(events))
+
+    return [
+        errors[todo_id] if todo_id in errors
+        else TodoBulkResult(id=todo_id, status=200, todo=TodoRead(**dict(owned[todo_id], done=True)))
+        for todo_id in bulk.ids
+    ]
+
+
+#delete many todos
+@router.post("/bulk/delete", response_model=List[TodoBulkResult])
+async def delete_todos_bulk(
+    bulk: TodoBulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    owned, errors = await check_ownership(db, bulk.ids, current_user.id, "delete")
+
+    if owned:
+        statement = (
+            delete(Todo)
+            .where(Todo.id.in_(list(owned)), Todo.user_id == current_user.id)
+            .execution_options(synchronize_session=False)
+        )
+        if db.bind.dialect.delete_returning:
+            deleted = (await db.execute(statement.returning(Todo.done))).scalars().all()
+        else:
+            await db.execute(statement)
+            deleted = [row["done"] for row in owned.values()]
+        seq = await bump_todos_version(db, current_user.id, total=-len(deleted), done=-sum(deleted))
+    await db.commit()
+    if owned:
+        await send_todo_event(current_user.id, seq, todo_batch_event([todo_deleted_event(todo_id) for todo_id in owned]))
+
+    return [errors.get(todo_id, TodoBulkResult(id=todo_id, status=204)) for todo_id in bulk.ids]
@@ -1,22 +1,27 @@
 
 from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.helper.auth import get_current_user
+from app.helper.broadcast import send_todo_event
+from app.helper.todo_events import todo_created_event
+from app.helper.todo_versions import bump_todos_version
 from app.db.database import get_db
-from app.db.models import Todo, TodoCreate, TodoRead, User
+from app.db.models import Todo, TodoCreate, TodoRead, UserRead
 
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
 @router.post("/", response_model=TodoRead)
-def create_todo(
+async def create_todo(
     todo: TodoCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
 ):
     db_todo = Todo(**todo.dict(), user_id=current_user.id)
     db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
+    seq = await bump_todos_version(db, current_user.id, total=1, done=int(db_todo.done))
+    await db.commit()
+    await db.refresh(db_todo)
+    await send_todo_event(current_user.id, seq, todo_created_event(db_todo.dict()))
     return db_todo
\ No newline at end of file
@@ -2,31 +2,30 @@
 
 
 
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, status
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.helper.auth import get_current_user
+from app.helper.broadcast import send_todo_event
+from app.helper.todo_events import todo_deleted_event
+from app.helper.todo_queries import delete_owned_todo
+from app.helper.todo_versions import bump_todos_version
 from app.db.database import get_db
-from app.db.models import Todo, User
+from app.db.models import UserRead
 
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
 #delete a todo
 @router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_todo(
+async def delete_todo(
     todo_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
 ):
-    todo = db.get(Todo, todo_id)
-    if not todo:
-        raise HTTPException(status_code=404, detail="Todo not found")
-        
-    # Verify ownership
-    if todo.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this todo")
-    
-    db.delete(todo)
-    db.commit()
-    return None
\ No newline at end of file
+    # One conditional DELETE, which also verifies ownership
+    was_done = await delete_owned_todo(db, todo_id, current_user.id)
+    seq = await bump_todos_version(db, current_user.id, total=-1, done=-int(was_done))
+    await db.commit()
+    await send_todo_event(current_user.id, seq, todo_deleted_event(todo_id))
+    return None
@@ -0,0 +1,85 @@
+
+# Export all of a user's todos as NDJSON or CSV.
+# Rows are read through a server-side cursor in fixed-size partitions and written to the client as
+# they arrive, so memory use stays flat regardless of how many todos the user has.
+
+import csv
+import io
+from enum import Enum
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.helper.auth import get_current_user
+from app.helper.todo_queries import TODO_COLUMNS
+from app.db.replicas import replica_set, written_version
+from app.db.models import Todo, UserRead, UTCDatetime
+
+
+router = APIRouter(prefix="/todos", tags=["todos"])
+
+# Rows fetched from the cursor per round trip (and written per chunk)
+EXPORT_BATCH_SIZE = 1000
+
+FIELD_NAMES = [column.key for column in TODO_COLUMNS]
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def format_ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def format_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((row.id, row.description, row.deadline.isoformat(), row.done, row.user_id) for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_todos(statement, export_format: ExportFormat, read_engine):
+    # The request's session is closed before the body is streamed, so use a dedicated one
+    async with AsyncSession(read_engine) as db:
+        if export_format == ExportFormat.csv:
+            yield ",".join(FIELD_NAMES) + "\r\n"
+        result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                yield format_csv(rows)
+            else:
+                yield format_ndjson(rows)
+
+
+#export all todos of the current user
+@router.get("/export")
+async def export_todos(
+    request: Request,
+    format: ExportFormat = ExportFormat.ndjson,
+    done: Optional[bool] = None,
+    deadline_before: Optional[UTCDatetime] = None,
+    deadline_after: Optional[UTCDatetime] = None,
+    current_user: UserRead = Depends(get_current_user)
+):
+    statement = select(*TODO_COLUMNS).where(Todo.user_id == current_user.id)
+    if done is not None:
+        statement = statement.where(Todo.done == done)
+    if deadline_before is not None:
+        statement = statement.where(Todo.deadline < deadline_before)
+    if deadline_after is not None:
+        statement = statement.where(Todo.deadline > deadline_after)
+    statement = statement.order_by(Todo.id)
+
+    read_engine = await replica_set.engine_for(current_user.id, written_version(request, current_user.id))
+    media_type = "text/csv" if format == ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        stream_todos(statement, format, read_engine),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="todos.{format.value}"'},
+    )
@@ -1,26 +1,37 @@
 
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, Query, Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.helper.auth import get_current_user
-from app.db.database import get_db
-from app.db.models import Todo, TodoRead, User
+from app.helper.pagination import TodoOrder, build_page, paginate
+from app.helper.todo_queries import TODO_COLUMNS
+from app.helper.todo_lists import serve_todo_page
+from app.api.deps import get_read_db
+from app.db.models import Todo, TodoPage, UserRead
 
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
 
-#list all todos for the current user
-@router.get("/", response_model=List[TodoRead])
-def list_todos(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+#list all todos for the current user, one page per cursor
+@router.get("/", response_model=TodoPage)
+async def list_todos(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    order_by: TodoOrder = TodoOrder.id,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRead = Depends(get_current_user)
 ):
-    statement = select(Todo).where(Todo.user_id == current_user.id).offset(skip).limit(limit)
-    todos = db.exec(statement).all()
-    return todos
+    async def load_page():
+        statement = select(*TODO_COLUMNS).where(Todo.user_id == current_user.id)
+        statement = paginate(statement, order_by, cursor, limit)
+        rows = (await db.exec(statement)).all()
+        return build_page(rows, order_by, limit)
+
+    page_key = ("all", order_by.value, cursor, limit)
+    return await serve_todo_page(request, db, current_user.id, page_key, load_page)
 
@@ -1,13 +1,17 @@
 
 # This endpoint allows users to log out by blacklisting their JWT token.
-# The token is stored in the BlacklistedToken table, and if the user tries to use it again, they will be denied access.
+# The token's jti and expiry are stored in the BlacklistedToken table, and if the user tries to use it again, they will be denied access.
+
+from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from jose import jwt
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.database import get_db
-from app.db.models import BlacklistedToken, User
+from app.db.models import BlacklistedToken, UserRead
 from app.helper.auth import get_current_user , oauth2_scheme
+from app.helper.revocation import revocation_cache
 
 
 router = APIRouter(tags=["authentication"]) 
@@ -15,7 +19,7 @@ router = APIRouter(tags=["authentication"])
 # User logout endpoint
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user),token: str = Depends(oauth2_scheme) ,db: Session = Depends(get_db)):
+async def logout(current_user: UserRead = Depends(get_current_user),token: str = Depends(oauth2_scheme) ,db: AsyncSession = Depends(get_db)):
     # Ensure the current user is valid
     if not current_user:
         raise HTTPException(
@@ -23,17 +27,22 @@ def logout(current_user: User = Depends(get_current_user),token: str = Depends(o
             detail="Invalid user"
         )
     
+    # The token was already verified by get_current_user
+    claims = jwt.get_unverified_claims(token)
+    jti = claims["jti"]
+    expires_at = datetime.utcfromtimestamp(claims["exp"])
+
     # Check if token is already blacklisted
-    statement = select(BlacklistedToken).where(BlacklistedToken.token == token)
-    existing_token = db.exec(statement).first()
+    existing_token = await db.get(BlacklistedToken, jti)
     
     if existing_token:
         return {"detail": "Already logged out"}
     
     # Add token to blacklist
-    blacklisted_token = BlacklistedToken(token=token)
+    blacklisted_token = BlacklistedToken(jti=jti, expires_at=expires_at)
     db.add(blacklisted_token)
-    db.commit()
+    await db.commit()
+    revocation_cache.add(jti, expires_at)
     
     return {"detail": f"User {current_user.email} successfully logged out"}
 
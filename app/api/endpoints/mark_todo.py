@@ -1,11 +1,15 @@
 
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
+from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.helper.auth import get_current_user
+from app.helper.broadcast import send_todo_event
+from app.helper.todo_events import todo_updated_event
+from app.helper.todo_queries import update_owned_todo
+from app.helper.todo_versions import bump_todos_version
 from app.db.database import get_db
-from app.db.models import Todo, TodoRead, User
+from app.db.models import TodoRead, UserRead
 
 
 router = APIRouter(prefix="/todos", tags=["todos"])
@@ -13,21 +17,14 @@ router = APIRouter(prefix="/todos", tags=["todos"])
 
 #mark a todo as completed
 @router.patch("/{todo_id}/complete", response_model=TodoRead)
-def mark_todo_as_completed(
+async def mark_todo_as_completed(
     todo_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
 ):
-    db_todo = db.get(Todo, todo_id)
-    if not db_todo:
-        raise HTTPException(status_code=404, detail="Todo not found")
-        
-    # Verify ownership
-    if db_todo.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to update this todo")
-    
-    db_todo.done = True
-    db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
+    # One conditional UPDATE, which also verifies ownership
+    db_todo, done = await update_owned_todo(db, todo_id, current_user.id, {"done": True})
+    seq = await bump_todos_version(db, current_user.id, done=done)
+    await db.commit()
+    await send_todo_event(current_user.id, seq, todo_updated_event(todo_id, {"done": True}))
     return db_todo
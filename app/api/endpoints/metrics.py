@@ -0,0 +1,22 @@
+
+# Prometheus scrape endpoint, plus the latest sampled slow requests as JSON.
+
+from fastapi import APIRouter, Response
+
+from app.helper.metrics import render_metrics, slow_requests
+
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+#requests slower than SLOW_REQUEST_MS, newest last
+@router.get("/metrics/slow", include_in_schema=False)
+async def slow():
+    return list(slow_requests)
@@ -0,0 +1,58 @@
+
+# Full-text search over the current user's todos, with optional status and deadline range filters.
+# Matching uses the dialect's search index (see app.db.search), pages use the same keyset pagination,
+# ETag handling and response cache as the list endpoints.
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.helper.auth import get_current_user
+from app.helper.pagination import TodoOrder, build_page, paginate
+from app.helper.todo_queries import TODO_COLUMNS
+from app.helper.todo_lists import serve_todo_page
+from app.api.deps import get_read_db
+from app.db.models import Todo, TodoPage, UserRead, UTCDatetime
+from app.db.search import search_condition, search_terms
+
+
+router = APIRouter(prefix="/todos", tags=["todos"])
+
+
+#search todos by words in their description
+@router.get("/search", response_model=TodoPage)
+async def search_todos(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    done: Optional[bool] = None,
+    deadline_before: Optional[UTCDatetime] = None,
+    deadline_after: Optional[UTCDatetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    order_by: TodoOrder = TodoOrder.id,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query has no words")
+
+    async def load_page():
+        statement = select(*TODO_COLUMNS).where(
+            Todo.user_id == current_user.id,
+            search_condition(db.bind.dialect.name, terms),
+        )
+        if done is not None:
+            statement = statement.where(Todo.done == done)
+        if deadline_before is not None:
+            statement = statement.where(Todo.deadline < deadline_before)
+        if deadline_after is not None:
+            statement = statement.where(Todo.deadline > deadline_after)
+        statement = paginate(statement, order_by, cursor, limit)
+        rows = (await db.exec(statement)).all()
+        return build_page(rows, order_by, limit)
+
+    page_key = ("search", tuple(terms), done, deadline_before, deadline_after, order_by.value, cursor, limit)
+    return await serve_todo_page(request, db, current_user.id, page_key, load_page)
@@ -2,10 +2,12 @@
 
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.database import get_db
 from app.db.models import User, UserCreate, UserRead
+from app.db.replicas import replica_set
 from app.helper.auth import get_password_hash
 
 
@@ -15,10 +17,10 @@ router = APIRouter(tags=["authentication"])
 # User registration endpoint
 
 @router.post("/register", response_model=UserRead)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if email already exists
     statement = select(User).where(User.email == user.email)
-    existing_user = db.exec(statement).first()
+    existing_user = (await db.exec(statement)).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -26,11 +28,13 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user with hashed password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = User(name=user.name, email=user.email, password=hashed_password)
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    # The new user's first reads go to the primary, replicas may not have the row yet
+    replica_set.note_write(db_user.id)
     
     return db_user
\ No newline at end of file
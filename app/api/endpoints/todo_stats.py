@@ -0,0 +1,20 @@
+
+from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.helper.auth import get_current_user
+from app.helper.todo_stats import get_todo_stats
+from app.api.deps import get_read_db
+from app.db.models import TodoStats, UserRead
+
+
+router = APIRouter(prefix="/todos", tags=["todos"])
+
+
+#counts of the current user's todos, without loading them
+@router.get("/stats", response_model=TodoStats)
+async def todo_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    return await get_todo_stats(db, current_user.id)
@@ -1,10 +1,6 @@
 # Add this to your main FastAPI application file (e.g., main.py)
 
-from fastapi import APIRouter, WebSocket , Depends
-from sqlmodel import Session
-
-
-from app.db.database import get_db
+from fastapi import APIRouter, WebSocket
 
 
 from app.helper.broadcast import websocket_endpoint
@@ -13,6 +9,7 @@ from app.helper.broadcast import websocket_endpoint
 router = APIRouter(tags=["websocket"])
 
 # Add WebSocket route
+# No database session dependency: it would stay checked out for the whole life of the socket
 @router.websocket("/ws")
-async def websocket_route(websocket: WebSocket, token: str, db: Session = Depends(get_db)):
-    await websocket_endpoint(websocket, token, db)
+async def websocket_route(websocket: WebSocket, token: str):
+    await websocket_endpoint(websocket, token)
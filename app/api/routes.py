@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 
-from app.api.endpoints import completed_todos, create_todo, delete_todo, edit_todo, list_todos, login, logout, mark_todo, signup, websocket
+from app.api.endpoints import bulk_todos, completed_todos, create_todo, delete_todo, edit_todo, export_todos, list_todos, login, logout, mark_todo, metrics, search_todos, signup, todo_stats, websocket
 
 
 router = APIRouter()
@@ -11,12 +11,18 @@ router.include_router(signup.router)
 router.include_router(login.router)
 router.include_router(logout.router)
 
+# Bulk routes go before the /todos/{todo_id} routes so "bulk" is not read as an id
+router.include_router(bulk_todos.router)
 router.include_router(create_todo.router)
 router.include_router(list_todos.router)
 router.include_router(completed_todos.router)
+router.include_router(search_todos.router)
+router.include_router(todo_stats.router)
+router.include_router(export_todos.router)
 router.include_router(mark_todo.router)
 
 router.include_router(delete_todo.router)
 router.include_router(edit_todo.router)
 
-router.include_router(websocket.router)
\ No newline at end of file
+router.include_router(websocket.router)
+router.include_router(metrics.router)
\ No newline at end of file
@@ -1,7 +1,18 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
 
+from app.db.models import SCHEMA_VERSION, SchemaVersion
+from app.db.search import create_search_indexes
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 # Database connection URL
 # DATABASE_URL = ""
@@ -11,15 +22,98 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL environment variable not set.")
 
+# Connection pool settings, per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this many seconds are replaced (-1 keeps them forever)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection with a lightweight ping when it is checked out
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Connections opened at startup so the first requests do not pay for connecting
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+# Log every SQL statement (slow, for debugging only)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Async driver used for each database dialect
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+# Turn a plain database URL into one that uses an async driver
+def get_async_database_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if not separator or dialect not in ASYNC_DRIVERS:
+        # Unknown dialect, assume the URL already names an async driver
+        return url
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+# ASYNC_DATABASE_URL overrides the driver picked from DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+
+# Create an async engine with the pool settings above
+def create_engine_from_settings(url: str) -> AsyncEngine:
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    # In-memory SQLite uses a single static connection, pool sizing does not apply
+    if not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return create_async_engine(url, **options)
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=True)
+
+# Create SQLAlchemy async engine
+engine = create_engine_from_settings(ASYNC_DATABASE_URL)
 
 # Dependency to get DB session
-def get_db():
-    with Session(engine) as session:
+async def get_db():
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
+
+def _stored_schema_version(connection):
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return None
+    return connection.execute(select(SchemaVersion.version)).scalar()
+
+
+def _create_missing_indexes(connection):
+    # create_all only creates indexes together with their table, so add new ones to existing tables
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
 # Function to create tables
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+# create_all inspects every table and index, so it is skipped when the stored schema version matches
+async def create_db_and_tables():
+    async with engine.begin() as conn:
+        if await conn.run_sync(_stored_schema_version) == SCHEMA_VERSION:
+            return
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(create_search_indexes)
+        await conn.execute(SchemaVersion.__table__.delete())
+        await conn.execute(SchemaVersion.__table__.insert().values(id=1, version=SCHEMA_VERSION))
+        logger.info(f"Database schema created or updated to version {SCHEMA_VERSION}")
+
+
+# Open pooled connections ahead of the first requests
+async def warm_up_pool(connections: int = DB_POOL_WARMUP):
+    # Opened together and held until all are ready, so the pool keeps that many idle connections
+    # (anything beyond pool_size would be an overflow connection and closed again)
+    conns = await asyncio.gather(*(engine.connect() for _ in range(min(connections, DB_POOL_SIZE))))
+    try:
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in conns))
@@ -1,9 +1,23 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
-from datetime import datetime
-from pydantic import EmailStr
+from typing import Annotated, Optional, List
+from datetime import datetime, timezone
+from pydantic import AfterValidator, EmailStr
 
 
+def to_utc(value) -> Optional[datetime]:
+    """Naive UTC datetime for a deadline (aware values are converted), deadlines are stored without a timezone"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Datetime converted to naive UTC when validated, asyncpg rejects aware values for TIMESTAMP WITHOUT TIME ZONE
+UTCDatetime = Annotated[datetime, AfterValidator(to_utc)]
+
 
 # Model schemas for User
 class UserBase(SQLModel):
@@ -20,7 +34,7 @@ class UserRead(UserBase):
 # Model schemas for Todo
 class TodoBase(SQLModel):
     description: str
-    deadline: datetime
+    deadline: UTCDatetime
     done: bool = False
 
 class TodoCreate(TodoBase):
@@ -34,23 +48,75 @@ class TodoRead(TodoBase):
 
 
 
+# One page of a keyset-paginated todo listing
+class TodoPage(SQLModel):
+    items: List[TodoRead]
+    next_cursor: Optional[str] = None
+
+
+# Counts of the current user's todos
+class TodoStats(SQLModel):
+    total: int
+    done: int
+    pending: int
+    overdue: int
+
+
+
 class TodoUpdate(SQLModel):
     description: Optional[str] = None
-    deadline: Optional[datetime] = None
+    deadline: Optional[UTCDatetime] = None
     done: Optional[bool] = None
 
 
+# Model schemas for bulk todo operations
+BULK_MAX_ITEMS = 1000
+
+class TodoBulkCreate(SQLModel):
+    items: List[TodoCreate] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoBulkUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBulkUpdate(SQLModel):
+    items: List[TodoBulkUpdateItem] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoBulkIds(SQLModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+# Outcome of one item of a bulk request, status mirrors the single-item endpoint
+class TodoBulkResult(SQLModel):
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+    todo: Optional[TodoRead] = None
+
+
 # Database models
 class User(UserBase, table=True):
     __tablename__ = "users"
     
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     password: str
+    # Bumped on every change to the user's todos, used for list ETags
+    todos_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Todo counts, updated together with todos_version and recomputed by the stats repair job
+    todos_total: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    todos_done: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     
     todos: List["Todo"] = Relationship(back_populates="user")
 
 class Todo(TodoBase, table=True):
     __tablename__ = "todos"
+    # Composite indexes backing the keyset-paginated listings
+    __table_args__ = (
+        Index("ix_todos_user_id_id", "user_id", "id"),
+        Index("ix_todos_user_id_done_id", "user_id", "done", "id"),
+        Index("ix_todos_user_id_deadline_id", "user_id", "deadline", "id"),
+        Index("ix_todos_user_id_done_deadline_id", "user_id", "done", "deadline", "id"),
+        # Range scans over upcoming deadlines of all users, for the reminder scheduler
+        Index("ix_todos_done_deadline_id", "done", "deadline", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     user_id: int = Field(foreign_key="users.id")
@@ -60,9 +126,39 @@ class Todo(TodoBase, table=True):
 
 
 # Model for blacklisted tokens
+# Only the token's jti and expiry are stored, rows are purged once the token has expired
 class BlacklistedToken(SQLModel, table=True):
     __tablename__ = "blacklisted_tokens"
     
-    id: Optional[int] = Field(default=None, primary_key=True, index=True)
-    token: str = Field(unique=True, index=True)
-    blacklisted_on: datetime = Field(default_factory=datetime.utcnow)
+    jti: str = Field(primary_key=True, max_length=32)
+    expires_at: datetime = Field(index=True)
+    blacklisted_on: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+# Version of the tables and indexes above, bump it whenever they change
+# On startup create_all only runs when the stored version differs
+SCHEMA_VERSION = 5
+
+class SchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int
+
+
+# Model for the reminder scheduler's progress
+# Reminders have been sent for every todo up to (watermark_deadline, watermark_todo_id)
+class ReminderState(SQLModel, table=True):
+    __tablename__ = "reminder_state"
+
+    id: int = Field(default=1, primary_key=True)
+    watermark_deadline: datetime
+    watermark_todo_id: int = 0
+
+
+# Model for the todo stats repair job, the worker that moves last_run forward runs the repair
+class TodoStatsRepairState(SQLModel, table=True):
+    __tablename__ = "todo_stats_repair_state"
+
+    id: int = Field(default=1, primary_key=True)
+    last_run: datetime
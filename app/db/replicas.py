@@ -0,0 +1,173 @@
+
+# Read replicas.
+# DATABASE_REPLICA_URLS lists replica databases. Reads that can tolerate replication lag are spread
+# over the healthy replicas round-robin, everything else uses the primary engine. Replicas only get
+# reads once they have passed a health check.
+# A user who just changed their todos must see the change on their next read, whichever worker serves
+# it. The response to a write sets a short-lived cookie with the user's new todos_version; a read that
+# carries it only uses a replica whose copy of the user row has reached that version, otherwise the
+# primary. The worker that handled the write also keeps the user on the primary without checking, for
+# READ_YOUR_WRITES_SECONDS.
+
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+
+from app.db.database import create_engine_from_settings, engine, get_async_database_url
+from app.db.models import User
+
+logger = logging.getLogger(__name__)
+
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("REPLICA_HEALTH_CHECK_TIMEOUT", "2"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Cookie carrying "<user_id>:<todos_version>" of the user's latest write
+WRITE_MARK_COOKIE = "todos_version"
+
+# Filled by note_write during a request, turned into the cookie by ReadYourWritesMiddleware
+_write_mark: ContextVar[Optional[dict]] = ContextVar("write_mark", default=None)
+
+
+class ReplicaSet:
+    def __init__(self, engines: List[AsyncEngine]):
+        self.engines = engines
+        # Filled by the first health check, until then every read goes to the primary
+        self.healthy: List[AsyncEngine] = []
+        self._next = 0
+        # Format: {user_id: monotonic time until which the user reads from the primary}
+        self._recent_writes: Dict[int, float] = {}
+
+    def pick(self) -> AsyncEngine:
+        """Next healthy replica, or the primary when there is none"""
+        healthy = self.healthy
+        if not healthy:
+            return engine
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    def note_write(self, user_id: int, version: Optional[int] = None):
+        """Record a write, version is the user's todos_version after it"""
+        if not self.engines:
+            return
+        self._recent_writes[user_id] = time.monotonic() + READ_YOUR_WRITES_SECONDS
+        mark = _write_mark.get()
+        if mark is not None and version is not None:
+            mark["user_id"], mark["version"] = user_id, version
+
+    async def engine_for(self, user_id: int, written_version: Optional[int] = None) -> AsyncEngine:
+        """Engine for a read on behalf of a user who has written up to written_version"""
+        until = self._recent_writes.get(user_id)
+        if until is not None:
+            if until > time.monotonic():
+                return engine
+            del self._recent_writes[user_id]
+        replica = self.pick()
+        if replica is engine or written_version is None:
+            return replica
+        try:
+            async with replica.connect() as conn:
+                statement = select(User.todos_version).where(User.id == user_id)
+                version = (await conn.execute(statement)).scalar()
+        except Exception as e:
+            logger.error(f"Error reading from replica {replica.url.render_as_string()}: {e}")
+            return engine
+        if version is None or version < written_version:
+            # The replica has not caught up with the user's last write yet
+            return engine
+        return replica
+
+    async def check(self):
+        """Ping every replica and only route to the ones that answered"""
+        results = await asyncio.gather(*(self._ping(replica) for replica in self.engines))
+        healthy = [replica for replica, ok in zip(self.engines, results) if ok]
+        if len(healthy) != len(self.healthy):
+            logger.warning(f"{len(healthy)} of {len(self.engines)} read replicas healthy")
+        self.healthy = healthy
+
+        # Forget expired write marks
+        now = time.monotonic()
+        for user_id in [user_id for user_id, until in self._recent_writes.items() if until <= now]:
+            del self._recent_writes[user_id]
+
+    @staticmethod
+    async def _ping(replica: AsyncEngine) -> bool:
+        try:
+            async with replica.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), REPLICA_HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.error(f"Read replica {replica.url.render_as_string()} failed its health check: {e}")
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.engines),
+            "healthy": len(self.healthy),
+            "recent_writers": len(self._recent_writes),
+        }
+
+
+# Global replica set, empty (everything on the primary) unless DATABASE_REPLICA_URLS is set
+replica_set = ReplicaSet([create_engine_from_settings(get_async_database_url(url)) for url in REPLICA_URLS])
+
+
+# Background loop, started with the app
+async def run_replica_health_checks():
+    if not replica_set.engines:
+        return
+    while True:
+        await replica_set.check()
+        await asyncio.sleep(REPLICA_HEALTH_CHECK_SECONDS)
+
+
+# Dependency for reads that do not depend on the caller's own writes (e.g. authentication)
+async def get_replica_db():
+    async with AsyncSession(replica_set.pick(), expire_on_commit=False) as session:
+        yield session
+
+
+def written_version(request: Request, user_id: int) -> Optional[int]:
+    """The user's todos_version from their write mark cookie, if the request carries one"""
+    cookie_user_id, _, version = request.cookies.get(WRITE_MARK_COOKIE, "").partition(":")
+    if cookie_user_id != str(user_id) or not version.isdigit():
+        return None
+    return int(version)
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware setting the write mark cookie on responses to todo writes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_set.engines:
+            await self.app(scope, receive, send)
+            return
+
+        mark = {}
+        token = _write_mark.set(mark)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and mark:
+                cookie = (
+                    f"{WRITE_MARK_COOKIE}={mark['user_id']}:{mark['version']}; "
+                    f"Max-Age={max(1, int(READ_YOUR_WRITES_SECONDS))}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = dict(message, headers=[*message.get("headers", []), (b"set-cookie", cookie.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _write_mark.reset(token)
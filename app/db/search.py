@@ -0,0 +1,69 @@
+
+# Full-text search over todo descriptions.
+# SQLite uses an FTS5 table (todos_fts) with todos as its external content, kept in sync by triggers.
+# PostgreSQL uses a GIN index on to_tsvector(description), matched by the same expression so the
+# planner can use it. Other databases fall back to a case-insensitive substring match.
+# The DDL is idempotent and runs from create_db_and_tables whenever the schema version changes.
+
+import re
+from typing import List
+
+from sqlalchemy import and_, func, literal_column, select, text
+
+from app.db.models import Todo
+
+# Text search configuration for PostgreSQL, "simple" lowercases without language-specific stemming
+TS_CONFIG = "simple"
+
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(description, content='todos', content_rowid='id')",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+            INSERT INTO todos_fts(rowid, description) VALUES (new.id, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF description ON todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO todos_fts(rowid, description) VALUES (new.id, new.description);
+        END""",
+        # Index todos that existed before the table was created
+        "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+    ],
+    "postgresql": [
+        f"CREATE INDEX IF NOT EXISTS ix_todos_description_fts ON todos USING gin (to_tsvector('{TS_CONFIG}', description))",
+    ],
+}
+
+
+def create_search_indexes(connection):
+    """Create the search table/index for the connection's dialect (run with run_sync)"""
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query)
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards (and the escape character) so a term only matches itself"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_condition(dialect_name: str, terms: List[str]):
+    """WHERE clause matching todos whose description contains every one of the terms"""
+    if dialect_name == "sqlite":
+        # Each term quoted, so user input cannot inject FTS5 query syntax
+        match = " ".join(f'"{term}"' for term in terms)
+        matching_ids = select(text("rowid")).select_from(text("todos_fts")).where(
+            text("todos_fts MATCH :match").bindparams(match=match)
+        )
+        return Todo.id.in_(matching_ids)
+    if dialect_name == "postgresql":
+        # The configuration is inlined rather than bound, so the expression matches the index exactly
+        config = literal_column(f"'{TS_CONFIG}'")
+        tsquery = func.plainto_tsquery(config, " ".join(terms))
+        return func.to_tsvector(config, Todo.description).op("@@")(tsquery)
+    return and_(*(Todo.description.ilike(f"%{escape_like(term)}%", escape="\\") for term in terms))
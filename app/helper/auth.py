@@ -5,16 +5,21 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 
 
 from app.db import models
-from app.db.database import get_db
-from app.db.models import User, BlacklistedToken
+from app.db.database import engine
+from app.db.models import User, UserRead
+from app.db.replicas import get_replica_db
+from app.helper.hashing import REHASH_ON_LOGIN, hash_pool, pwd_context
+from app.helper.revocation import revocation_cache
+from app.helper.user_cache import get_user_by_email
 
 from dotenv import load_dotenv
 import os
@@ -29,26 +34,31 @@ if ALGORITHM is None:
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 
 
 # Security utilities
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 
-# Password utilities
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Password utilities (bcrypt runs on the dedicated hashing pool)
+async def verify_password(plain_password, hashed_password):
+    return await hash_pool.run(pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await hash_pool.run(pwd_context.hash, password)
 
 
 # User authentication
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     statement = select(User).where(User.email == email)
-    user = db.exec(statement).first()
+    user = (await db.exec(statement)).first()
     if not user:
         return False
-    if not verify_password(password, user.password):
+    valid, new_hash = await hash_pool.run(pwd_context.verify_and_update, password, user.password)
+    if not valid:
         return False
+    # Upgrade hashes made with an old work factor
+    if new_hash and REHASH_ON_LOGIN:
+        user.password = new_hash
+        db.add(user)
+        await db.commit()
     return user
 
 # Token creation
@@ -58,13 +68,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies the token in the blacklist
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 # Token validation
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Returns the user's identity (id, name, email), usually from the user cache
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_replica_db)) -> UserRead:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -72,23 +84,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     
 
-    # Check if token is blacklisted
-    statement = select(BlacklistedToken).where(BlacklistedToken.token == token)
-    blacklisted = db.exec(statement).first()
-    if blacklisted:
-        raise credentials_exception
-    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        jti: str = payload.get("jti")
+        if email is None or jti is None:
             raise credentials_exception
         
     except JWTError:
         raise credentials_exception
+
+    # Check if token is blacklisted
+    if revocation_cache.is_revoked(jti):
+        raise credentials_exception
         
-    statement = select(User).where(User.email == email)
-    user = db.exec(statement).first()
+    user = await get_user_by_email(db, email)
+    if user is None and db.bind is not engine:
+        # A user who just signed up may not have reached the replica yet
+        async with AsyncSession(engine) as primary:
+            user = await get_user_by_email(primary, email)
     if user is None:
         raise credentials_exception
     return user
@@ -98,16 +112,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 
 
 # Token verification (generic)
-def verify_token(token: str, credentials_exception, db: Session = None):
+async def verify_token(token: str, credentials_exception):
     try:
-        if db:
-            blacklisted = db.exec(select(BlacklistedToken).where(BlacklistedToken.token == token)).first()
-            if blacklisted:
-                raise credentials_exception
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        jti: str = payload.get("jti")
+        if email is None or jti is None:
+            raise credentials_exception
+        if revocation_cache.is_revoked(jti):
             raise credentials_exception
         return email
     except JWTError:
@@ -116,18 +128,23 @@ def verify_token(token: str, credentials_exception, db: Session = None):
 # WebSocket-safe version
 
 
-def get_current_user_from_token_ws(token: str, db: Session):
+async def get_current_user_from_token_ws(token: str) -> UserRead:
+    # Sockets live for hours, so instead of a request-scoped session the lookup uses a short-lived
+    # one (which only checks out a connection on a user cache miss) and releases it right away
     try:
-        blacklisted = db.exec(select(BlacklistedToken).where(BlacklistedToken.token == token)).first()
-        if blacklisted:
-            raise Exception("Token is blacklisted")
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if not email:
             raise Exception("Token missing subject")
+        jti: str = payload.get("jti")
+        if not jti:
+            raise Exception("Token missing jti")
+
+        if revocation_cache.is_revoked(jti):
+            raise Exception("Token is blacklisted")
         
-        user = db.exec(select(User).where(User.email == email)).first()
+        async with AsyncSession(engine) as db:
+            user = await get_user_by_email(db, email)
         if not user:
             raise Exception("User not found")
 
@@ -1,151 +1,437 @@
-from fastapi import WebSocket, WebSocketDisconnect, Depends
-from sqlmodel import Session
-from typing import Dict, List
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketDisconnected, WebSocketState
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Optional, Set
+import asyncio
 import json
 import logging
+import os
+import time
 from datetime import datetime
+from uuid import uuid4
 
-from app.db.database import get_db  
+from app.db.database import engine
 from app.helper.auth import get_current_user_from_token_ws
-from app.db.models import User
+from app.db.models import UserRead
+from app.helper.metrics import ws_broadcast_latency
+from app.helper.presence import PresenceIndex
+from app.helper.pubsub import PubSubBackend, create_pubsub_backend
+from app.helper.todo_events import serialize_event, todo_event_listeners, todo_event_log
+from app.helper.todo_versions import get_todos_version
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Outbound messages buffered per connection before the slow-client policy kicks in
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+# What to do with a client whose queue is full: "drop" closes it, "coalesce" replaces its backlog
+# with a single notice telling it how many messages it missed
+WS_SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "drop")
+# How often each worker announces its connected users to the others
+PRESENCE_HEARTBEAT_SECONDS = float(os.getenv("PRESENCE_HEARTBEAT_SECONDS", "15"))
+# Joins and leaves are collected for this long and sent as one presence_delta frame
+PRESENCE_TICK_SECONDS = float(os.getenv("PRESENCE_TICK_SECONDS", "0.5"))
+# Online users sent with the welcome message, clients page through the rest on demand
+PRESENCE_SNAPSHOT_LIMIT = int(os.getenv("PRESENCE_SNAPSHOT_LIMIT", "100"))
+# Topic every connection joins on connect; chat messages without a topic and join/leave events go here
+WS_DEFAULT_TOPIC = os.getenv("WS_DEFAULT_TOPIC", "lobby")
+# Upper bound on topics a single connection may subscribe to
+WS_MAX_TOPICS = int(os.getenv("WS_MAX_TOPICS", "50"))
+TOPIC_MAX_LENGTH = 64
+
+
+class Connection:
+    """A WebSocket with its own bounded outbound queue, drained by a writer task"""
+
+    def __init__(self, websocket: WebSocket, user: UserRead, max_queue: int):
+        self.id = uuid4().hex[:12]
+        self.websocket = websocket
+        self.user = user
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer_task: Optional[asyncio.Task] = None
+        # Set once the manager has dropped the connection, its receive loop exits on the next turn
+        self.closed = False
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        if self.writer_task:
+            self.writer_task.cancel()
+
+    def enqueue(self, message: str) -> bool:
+        """Queue a serialized message, returns False when the queue is full"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def coalesce(self, message: str) -> int:
+        """Replace the queued backlog with a notice and the latest message, returns how many were dropped"""
+        dropped = 0
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            dropped += 1
+        notice = {
+            "type": "messages_dropped",
+            "count": dropped,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        self.queue.put_nowait(json.dumps(notice))
+        self.queue.put_nowait(message)
+        return dropped
+
+    async def _writer(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # The receive loop notices the closed socket and cleans up
+            logger.error(f"Error sending message to user {self.user.id}: {e}")
+
+
 class ConnectionManager:
-    def __init__(self):
+    """
+    Holds this worker's sockets. Messages go through the pub/sub backend once and every worker
+    delivers them to the sockets it holds; presence of the whole cluster is kept in a PresenceIndex.
+    A user may hold several connections (one per tab or device), and broadcasts are addressed to a
+    topic so only the connections subscribed to it are touched.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        slow_client_policy: str = WS_SLOW_CLIENT_POLICY,
+        pubsub: Optional[PubSubBackend] = None,
+    ):
         # Store active connections with user info
-        # Format: {user_id: {"websocket": websocket, "user": user_object}}
-        self.active_connections: Dict[int, Dict] = {}
+        # Format: {user_id: {Connection, ...}}
+        self.active_connections: Dict[int, Set[Connection]] = {}
+        # Format: {topic: {Connection, ...}}
+        self.topics: Dict[str, Set[Connection]] = {}
+        self.max_queue = max_queue
+        self.slow_client_policy = slow_client_policy
+        # Fan-out metrics
+        self.dropped_connections = 0
+        self.coalesced_messages = 0
+        # Cluster wiring
+        self.pubsub = pubsub or create_pubsub_backend()
+        self.worker_id = uuid4().hex[:12]
+        self.presence = PresenceIndex()
+        # Format: {worker_id: monotonic time of its last presence message}
+        self.worker_seen: Dict[str, float] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._presence_task: Optional[asyncio.Task] = None
+        self._pending: set = set()
+
+    async def start(self):
+        """Join the cluster (called at startup)"""
+        await self.pubsub.start(self._on_bus_message)
+        await self._publish({"kind": "presence_sync"})
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._presence_task = asyncio.create_task(self._flush_presence())
+
+    async def stop(self):
+        for task in (self._heartbeat_task, self._presence_task):
+            if task:
+                task.cancel()
+        await self.pubsub.stop()
+
+    async def _publish(self, message: dict):
+        message["origin"] = self.worker_id
+        try:
+            await self.pubsub.publish(message)
+        except Exception as e:
+            logger.error(f"Error publishing {message.get('kind')} message: {e}")
+
+    def _publish_soon(self, message: dict):
+        """Publish from synchronous code"""
+        task = asyncio.create_task(self._publish(message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _on_bus_message(self, message: dict):
+        """Handle a message published by any worker, including this one"""
+        kind = message.get("kind")
+        if kind == "broadcast":
+            self._broadcast_local(message["topic"], message["message"], message.get("exclude_user_id"))
+            ws_broadcast_latency.observe(time.time() - message["sent_at"])
+        elif kind == "user":
+            self._send_local(message["user_id"], message["message"])
+        elif kind == "todo_event":
+            # Every worker records the event, so a client can resume on any of them
+            todo_event_log.append(message["user_id"], message["seq"], message["message"])
+            self._send_local(message["user_id"], message["message"])
+        elif message.get("origin") != self.worker_id:
+            self._on_remote_presence(kind, message)
+
+    def _on_remote_presence(self, kind: str, message: dict):
+        origin = message["origin"]
+        if kind == "presence_sync":
+            # A worker just started, tell it who is connected here
+            self._publish_soon(self._presence_snapshot())
+            return
+        self.worker_seen[origin] = time.monotonic()
+        if kind == "presence":
+            self.presence.replace_worker(origin, message["users"])
+        elif kind == "presence_join":
+            self.presence.add(origin, message["user"])
+        elif kind == "presence_leave":
+            self.presence.remove(origin, message["user_id"])
+
+    def _presence_snapshot(self) -> dict:
+        return {"kind": "presence", "users": self._local_users()}
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(PRESENCE_HEARTBEAT_SECONDS)
+            await self._publish(self._presence_snapshot())
+            # Forget workers that stopped announcing themselves
+            cutoff = time.monotonic() - 3 * PRESENCE_HEARTBEAT_SECONDS
+            for worker_id in [w for w, seen in self.worker_seen.items() if seen < cutoff]:
+                del self.worker_seen[worker_id]
+                self.presence.drop_worker(worker_id)
+
+    async def _flush_presence(self):
+        """Send the net joins and leaves of each tick to this worker's sockets as one frame"""
+        while True:
+            await asyncio.sleep(PRESENCE_TICK_SECONDS)
+            delta = self.presence.flush()
+            if delta:
+                delta_message = {"type": "presence_delta", **delta, "timestamp": datetime.utcnow().isoformat()}
+                self._broadcast_local(WS_DEFAULT_TOPIC, json.dumps(delta_message))
     
-    async def connect(self, websocket: WebSocket, user: User):
+    async def connect(self, websocket: WebSocket, user: UserRead) -> Connection:
         """Accept WebSocket connection and store user info"""
         await websocket.accept()
-        self.active_connections[user.id] = {
-            "websocket": websocket,
-            "user": user
-        }
-        logger.info(f"User {user.name} (ID: {user.id}) connected")
-        
-        # Notify other users about new connection
-        await self.broadcast_user_status(user, "joined", exclude_user_id=user.id)
+        connection = Connection(websocket, user, self.max_queue)
+        connection.start()
+        first_connection = user.id not in self.active_connections
+        self.active_connections.setdefault(user.id, set()).add(connection)
+        self.subscribe(connection, WS_DEFAULT_TOPIC)
+        logger.info(f"User {user.name} (ID: {user.id}) connected ({connection.id})")
+
+        # Only the user's first connection changes presence, further tabs join silently
+        if first_connection:
+            user_info = self._user_info(user)
+            self.presence.add(self.worker_id, user_info)
+            await self._publish({"kind": "presence_join", "user": user_info})
+        return connection
     
-    def disconnect(self, user_id: int):
-        """Remove connection for a user"""
-        if user_id in self.active_connections:
-            user = self.active_connections[user_id]["user"]
-            del self.active_connections[user_id]
-            logger.info(f"User {user.name} (ID: {user_id}) disconnected")
-            return user
-        return None
+    def disconnect(self, connection: Connection) -> Optional[UserRead]:
+        """Remove a connection, returns the user if it was their last one on this worker"""
+        user = connection.user
+        connections = self.active_connections.get(user.id)
+        if not connections or connection not in connections:
+            return None
+        connections.discard(connection)
+        connection.closed = True
+        connection.stop()
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+        logger.info(f"User {user.name} (ID: {user.id}) disconnected ({connection.id})")
+        if connections:
+            return None
+        del self.active_connections[user.id]
+        self.presence.remove(self.worker_id, user.id)
+        self._publish_soon({"kind": "presence_leave", "user_id": user.id})
+        return user
+
+    def subscribe(self, connection: Connection, topic: str) -> bool:
+        """Add a connection to a topic, returns False if it already holds the maximum number of topics"""
+        if topic not in connection.topics and len(connection.topics) >= WS_MAX_TOPICS:
+            return False
+        connection.topics.add(topic)
+        self.topics.setdefault(topic, set()).add(connection)
+        return True
+
+    def unsubscribe(self, connection: Connection, topic: str):
+        connection.topics.discard(topic)
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            # Drop empty topics so the index only holds live rooms
+            if not subscribers:
+                del self.topics[topic]
+
+    def _deliver(self, connection: Connection, message_str: str):
+        """Queue a message for one connection, applying the slow-client policy if it is full"""
+        if connection.closed:
+            return
+        if connection.enqueue(message_str):
+            return
+        if self.slow_client_policy == "coalesce":
+            self.coalesced_messages += connection.coalesce(message_str)
+            return
+        logger.warning(f"Dropping slow connection of user {connection.user.id} ({connection.id})")
+        self.dropped_connections += 1
+        self.disconnect(connection)
+        # Closing makes the connection's receive loop exit
+        task = asyncio.create_task(self._close_slow(connection.websocket))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    @staticmethod
+    async def _close_slow(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
     
+    def reply(self, connection: Connection, message: dict):
+        """Send a message to one socket held by this worker, without going through the cluster"""
+        self.reply_text(connection, json.dumps(message))
+
+    def reply_text(self, connection: Connection, message_str: str):
+        self._deliver(connection, message_str)
+
     async def send_personal_message(self, message: str, user_id: int):
-        """Send message to a specific user"""
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]["websocket"]
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id}: {e}")
-                # Remove dead connection
-                self.disconnect(user_id)
+        """Send message to every connection of a specific user, on whichever workers hold them"""
+        await self._publish({"kind": "user", "user_id": user_id, "message": message})
+
+    async def send_todo_event(self, message: str, user_id: int, seq: int):
+        """Like send_personal_message, but also kept for clients resuming from an earlier seq"""
+        await self._publish({"kind": "todo_event", "user_id": user_id, "seq": seq, "message": message})
+
+    def _send_local(self, user_id: int, message_str: str):
+        for connection in list(self.active_connections.get(user_id, ())):
+            self._deliver(connection, message_str)
     
-    async def broadcast_message(self, message: dict, exclude_user_id: int = None):
-        """Broadcast message to all connected users except the sender"""
+    async def broadcast_message(self, message: dict, exclude_user_id: int = None, topic: str = WS_DEFAULT_TOPIC):
+        """Broadcast message to the subscribers of a topic except the sender"""
+        # Serialize once and publish once, each worker then only enqueues it per subscriber
         message_str = json.dumps(message)
-        dead_connections = []
-        
-        for user_id, connection_info in self.active_connections.items():
+        await self._publish({
+            "kind": "broadcast",
+            "topic": topic,
+            "message": message_str,
+            "exclude_user_id": exclude_user_id,
+            # Wall clock, so the latency can be measured on the other workers too
+            "sent_at": time.time(),
+        })
+
+    def _broadcast_local(self, topic: str, message_str: str, exclude_user_id: int = None):
+        """Queue a serialized broadcast for this worker's subscribers of a topic"""
+        for connection in list(self.topics.get(topic, ())):
             # Skip the sender
-            if exclude_user_id and user_id == exclude_user_id:
+            if exclude_user_id and connection.user.id == exclude_user_id:
                 continue
-                
-            websocket = connection_info["websocket"]
-            try:
-                await websocket.send_text(message_str)
-            except Exception as e:
-                logger.error(f"Error broadcasting to user {user_id}: {e}")
-                dead_connections.append(user_id)
-        
-        # Clean up dead connections
-        for user_id in dead_connections:
-            self.disconnect(user_id)
-    
-    async def broadcast_user_status(self, user: User, status: str, exclude_user_id: int = None):
-        """Broadcast user status changes (joined/left)"""
-        status_message = {
-            "type": "user_status",
-            "user_id": user.id,
-            "user_name": user.name,
-            "status": status,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        await self.broadcast_message(status_message, exclude_user_id)
+            self._deliver(connection, message_str)
     
+    @staticmethod
+    def _user_info(user: UserRead) -> dict:
+        return {"id": user.id, "name": user.name, "email": user.email}
+
+    def _local_users(self) -> List[dict]:
+        return [self._user_info(next(iter(connections)).user) for connections in self.active_connections.values()]
+
     def get_active_users(self) -> List[dict]:
-        """Get list of currently active users"""
-        return [
-            {
-                "id": user_id,
-                "name": connection_info["user"].name,
-                "email": connection_info["user"].email
-            }
-            for user_id, connection_info in self.active_connections.items()
-        ]
+        """Get list of currently active users across all workers"""
+        return list(self.presence.users.values())
     
     def get_user_count(self) -> int:
-        """Get count of active users"""
-        return len(self.active_connections)
+        """Get count of active users across all workers"""
+        return len(self.presence)
+
+    def presence_snapshot(self, cursor: Optional[int] = None, limit: int = PRESENCE_SNAPSHOT_LIMIT) -> dict:
+        """One page of online users with the presence version it was taken at"""
+        return self.presence.page(cursor, limit)
+
+    def stats(self) -> dict:
+        """Queue depth and drop counters for monitoring"""
+        depths = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections
+        ]
+        return {
+            "users": len(self.active_connections),
+            "online_users": len(self.presence),
+            "connections": len(depths),
+            "topics": len(self.topics),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_connections": self.dropped_connections,
+            "coalesced_messages": self.coalesced_messages,
+            "todo_event_log_bytes": todo_event_log.total_bytes,
+        }
 
 # Global connection manager instance
 manager = ConnectionManager()
 
-async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, token: str):
     """
     WebSocket endpoint for authenticated real-time messaging
     Usage: ws://localhost:8000/ws?token=your_jwt_token
     """
     try:
         # Authenticate user using token
-        user = get_current_user_from_token_ws(token, db)
+        user = await get_current_user_from_token_ws(token)
         
         # Connect user
-        await manager.connect(websocket, user)
+        connection = await manager.connect(websocket, user)
         
-        # Send welcome message with active users list
+        # Send welcome message with the first page of online users, presence_delta frames follow
         welcome_message = {
             "type": "welcome",
             "message": f"Welcome {user.name}! You are now connected.",
-            "active_users": manager.get_active_users(),
-            "user_count": manager.get_user_count(),
+            "connection_id": connection.id,
+            "topics": sorted(connection.topics),
+            "presence": manager.presence_snapshot(),
             "timestamp": datetime.utcnow().isoformat()
         }
-        await websocket.send_text(json.dumps(welcome_message))
+        manager.reply(connection, welcome_message)
         
-        # Listen for messages
-        while True:
+        # Listen for messages until the client leaves or the connection is dropped as too slow
+        while not connection.closed and websocket.application_state == WebSocketState.CONNECTED:
             try:
                 # Receive message from client
                 data = await websocket.receive_text()
                 message_data = json.loads(data)
+
+                # Topic subscriptions: {"type": "subscribe" | "unsubscribe", "topic": "..."}
+                if message_data.get("type") in ("subscribe", "unsubscribe"):
+                    handle_subscription(connection, message_data)
+                    continue
+
+                # Further snapshot pages: {"type": "presence", "cursor": <next_cursor>}
+                if message_data.get("type") == "presence":
+                    handle_presence_page(connection, message_data)
+                    continue
+
+                # Todo event replay: {"type": "resume", "seq": <last seq seen>}
+                if message_data.get("type") == "resume":
+                    await handle_resume(connection, message_data)
+                    continue
                 
                 # Validate message structure
-                if "message" not in message_data:
+                topic = message_data.get("topic", WS_DEFAULT_TOPIC)
+                if "message" not in message_data or not valid_topic(topic):
                     error_msg = {"type": "error", "message": "Invalid message format"}
-                    await websocket.send_text(json.dumps(error_msg))
+                    manager.reply(connection, error_msg)
+                    continue
+                if topic not in connection.topics:
+                    error_msg = {"type": "error", "message": f"Not subscribed to topic {topic}"}
+                    manager.reply(connection, error_msg)
                     continue
                 
                 # Create broadcast message
                 broadcast_data = {
                     "type": "message",
+                    "topic": topic,
                     "user_id": user.id,
                     "user_name": user.name,
                     "message": message_data["message"],
                     "timestamp": datetime.utcnow().isoformat()
                 }
                 
-                # Broadcast to all other users
-                await manager.broadcast_message(broadcast_data, exclude_user_id=user.id)
+                # Broadcast to the other subscribers of the topic
+                await manager.broadcast_message(broadcast_data, exclude_user_id=user.id, topic=topic)
                 
                 # Send confirmation back to sender
                 confirmation = {
@@ -153,35 +439,98 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Dep
                     "message": "Message broadcasted successfully",
                     "timestamp": datetime.utcnow().isoformat()
                 }
-                await websocket.send_text(json.dumps(confirmation))
+                manager.reply(connection, confirmation)
                 
             except json.JSONDecodeError:
                 error_msg = {"type": "error", "message": "Invalid JSON format"}
-                await websocket.send_text(json.dumps(error_msg))
+                manager.reply(connection, error_msg)
+            except (WebSocketDisconnect, WebSocketDisconnected):
+                # WebSocketDisconnected: the socket was closed by the server (see _close_slow)
+                raise
             except Exception as e:
+                if connection.closed or websocket.application_state != WebSocketState.CONNECTED:
+                    # Closed by the server while receiving (see _close_slow), a normal disconnect
+                    break
                 logger.error(f"Error processing message from user {user.id}: {e}")
                 error_msg = {"type": "error", "message": "Error processing message"}
-                await websocket.send_text(json.dumps(error_msg))
+                manager.reply(connection, error_msg)
                 
+    except (WebSocketDisconnect, WebSocketDisconnected):
+        # Handle normal disconnection
+        pass
     except Exception as auth_error:
         # Authentication failed
         logger.warning(f"WebSocket authentication failed: {auth_error}")
         await websocket.close(code=4001, reason="Authentication failed")
         return
-    
-    except WebSocketDisconnect:
-        # Handle normal disconnection
-        pass
-    except Exception as e:
-        logger.error(f"WebSocket error: {e}")
     finally:
         # Clean up connection
-        if 'user' in locals():
-            disconnected_user = manager.disconnect(user.id)
-            if disconnected_user:
-                # Notify other users about disconnection
-                await manager.broadcast_user_status(disconnected_user, "left")
+        # Other users learn about the leave from the next presence_delta
+        if 'connection' in locals():
+            manager.disconnect(connection)
+
+
+def valid_topic(topic) -> bool:
+    return isinstance(topic, str) and 0 < len(topic) <= TOPIC_MAX_LENGTH
+
+
+def handle_subscription(connection: Connection, message_data: dict):
+    """Subscribe or unsubscribe a connection and confirm it to the client"""
+    topic = message_data.get("topic")
+    if not valid_topic(topic):
+        manager.reply(connection, {"type": "error", "message": "Invalid topic"})
+        return
+    if message_data["type"] == "subscribe":
+        if not manager.subscribe(connection, topic):
+            manager.reply(connection, {"type": "error", "message": f"Too many topics (max {WS_MAX_TOPICS})"})
+            return
+        reply_type = "subscribed"
+    else:
+        manager.unsubscribe(connection, topic)
+        reply_type = "unsubscribed"
+    reply = {
+        "type": reply_type,
+        "topic": topic,
+        "topics": sorted(connection.topics),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    manager.reply(connection, reply)
+
+
+
+def handle_presence_page(connection: Connection, message_data: dict):
+    cursor = message_data.get("cursor")
+    if cursor is not None and (not isinstance(cursor, int) or isinstance(cursor, bool)):
+        manager.reply(connection, {"type": "error", "message": "Invalid cursor"})
+        return
+    manager.reply(connection, {"type": "presence_page", **manager.presence_snapshot(cursor)})
+
+
+async def handle_resume(connection: Connection, message_data: dict):
+    """Replay the todo events a client missed, or tell it to reload when they are not all buffered"""
+    seq = message_data.get("seq")
+    if not isinstance(seq, int) or isinstance(seq, bool):
+        manager.reply(connection, {"type": "error", "message": "Invalid seq"})
+        return
+    user_id = connection.user.id
+    async with AsyncSession(engine) as db:
+        current = await get_todos_version(db, user_id)
+
+    events = todo_event_log.since(user_id, seq, current) if seq <= current else None
+    if events is None:
+        manager.reply(connection, {"type": "resync_required", "seq": current})
+        return
+    # Events published while this runs are also delivered live, clients skip seqs they already applied
+    for event in events:
+        manager.reply_text(connection, event)
+    manager.reply(connection, {"type": "resumed", "seq": current, "replayed": len(events)})
+
 
+async def send_todo_event(user_id: int, seq: int, event: dict):
+    """Push a todo change to all of the owner's connections (call after the change is committed)"""
+    for listener in todo_event_listeners:
+        listener(event)
+    await manager.send_todo_event(serialize_event(seq, event), user_id, seq)
 
 
 async def send_message_to_user(user_id: int, message: dict):
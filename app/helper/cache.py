@@ -0,0 +1,125 @@
+
+# Per-user response cache for the todo list endpoints.
+# Entries hold serialized list pages keyed by (user_id, todos_version, filter, page); because the key
+# includes the user's todo version, an entry can never be served after that user's todos changed,
+# even when the change was made by another worker. Write paths also invalidate the user's entries
+# so stale pages do not take up room.
+#
+# The in-process LRU backend is the default; any class implementing CacheBackend can be plugged in
+# with RESPONSE_CACHE_BACKEND="package.module:ClassName" (it is constructed with the maxsize).
+
+import importlib
+import os
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+# Total size of the cached pages of the in-process backend, one page can hold up to 500 todos
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND")
+
+# Keys are tuples whose first item is the owning user's id
+CacheKey = Tuple[Hashable, ...]
+
+
+class CacheBackend:
+    """Interface for response cache backends"""
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: CacheKey, value: bytes):
+        raise NotImplementedError
+
+    def invalidate(self, user_id: int):
+        """Drop every entry belonging to a user"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class LRUCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self.total_bytes = 0
+        # Format: {user_id: {key, ...}}
+        self._keys_by_user: Dict[int, Set[CacheKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: CacheKey, value: bytes):
+        if self.maxsize <= 0 or len(value) > self.max_bytes:
+            return
+        old_value = self._entries.get(key)
+        if old_value is not None:
+            self.total_bytes -= len(old_value)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self.total_bytes += len(value)
+        self._keys_by_user.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.maxsize or self.total_bytes > self.max_bytes:
+            oldest, oldest_value = self._entries.popitem(last=False)
+            self.total_bytes -= len(oldest_value)
+            self._forget(oldest)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        keys = self._keys_by_user.pop(user_id, ())
+        for key in keys:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self.total_bytes -= len(value)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_user.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _forget(self, key: CacheKey):
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+def create_cache_backend() -> CacheBackend:
+    if not RESPONSE_CACHE_BACKEND:
+        return LRUCacheBackend(RESPONSE_CACHE_SIZE)
+    module_name, _, class_name = RESPONSE_CACHE_BACKEND.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(RESPONSE_CACHE_SIZE)
+
+
+# Global response cache instance
+response_cache = create_cache_backend()
@@ -0,0 +1,79 @@
+
+# Password hashing on a dedicated, bounded thread pool.
+# bcrypt is CPU bound and releases the GIL, so running it on its own threads keeps login and
+# registration bursts from blocking the event loop or starving FastAPI's shared threadpool.
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# bcrypt work factor, existing hashes with a different factor are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Number of threads hashing at the same time
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash jobs allowed to wait or run before new ones are rejected with 503
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "256"))
+# Store a new hash when a login succeeds with an outdated one
+REHASH_ON_LOGIN = os.getenv("REHASH_ON_LOGIN", "true").lower() == "true"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class HashPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Queue metrics
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, func, *args):
+        """Run a hashing function on the pool, rejecting the call when the queue is full"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        def job():
+            started = time.perf_counter()
+            return func(*args), started, time.perf_counter()
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.wait_seconds += started - submitted
+        self.run_seconds += finished - started
+        return result
+
+    def stats(self) -> dict:
+        """Current queue depth and timing of the pool"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.pending,
+            "queued": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": 1000 * self.wait_seconds / self.completed if self.completed else 0.0,
+            "avg_run_ms": 1000 * self.run_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+# Global hashing pool instance
+hash_pool = HashPool(HASH_POOL_WORKERS, HASH_MAX_PENDING)
+
@@ -0,0 +1,207 @@
+
+# Request and SQL instrumentation, exposed in the Prometheus text format on /metrics.
+# MetricsMiddleware times every HTTP request per route template. SQLAlchemy cursor events count the
+# statements a request runs and the time spent in them, and the JSON responses record how long they
+# took to encode; the per-request totals are collected in a context variable and observed into
+# histograms when the response has been sent. Requests slower than SLOW_REQUEST_MS are logged and
+# the latest ones are kept for /metrics/slow.
+
+import logging
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.db.database import engine
+from app.db.replicas import replica_set
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Requests taking longer than this are sampled (0 disables sampling)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Fraction of slow requests that are logged and kept
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "1.0"))
+SLOW_REQUEST_LOG_SIZE = int(os.getenv("SLOW_REQUEST_LOG_SIZE", "100"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Format: {label values: [count per bucket..., count above the last bucket, sum, count]}
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {series[-1]}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class RequestStats:
+    """Totals of one request, filled in by the SQL hooks and the response classes"""
+
+    __slots__ = ("sql_statements", "sql_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+ROUTE_LABELS = ("method", "route")
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+request_sql_statements = Histogram(
+    "http_request_sql_statements", "SQL statements per HTTP request", ROUTE_LABELS, STATEMENT_BUCKETS)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time per HTTP request spent executing SQL", ROUTE_LABELS)
+request_serialize_seconds = Histogram(
+    "http_request_serialize_seconds", "Time per HTTP request spent encoding the response body", ROUTE_LABELS)
+ws_broadcast_latency = Histogram(
+    "ws_broadcast_seconds", "Time from publishing a WebSocket broadcast to queueing it for local subscribers", ())
+
+# Latest sampled slow requests, newest last
+slow_requests: deque = deque(maxlen=SLOW_REQUEST_LOG_SIZE)
+
+# Callables returning {name: value} merged into /metrics as gauges, registered by the components
+# that own the numbers (the hash pool, the response cache, the connection manager)
+stats_sources: Dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(prefix: str, source: Callable[[], dict]):
+    stats_sources[prefix] = source
+
+
+def record_serialization(seconds: float):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.sql_statements += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+for _engine in (engine, *replica_set.engines):
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests (WebSocket and lifespan traffic passes through untouched)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _request_stats.reset(token)
+            # Route templates keep the label set bounded, unmatched paths are grouped together
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe_request(scope, route, status_code, duration, stats)
+
+
+def observe_request(scope, route: str, status_code: int, duration: float, stats: RequestStats):
+    method = scope["method"]
+    request_latency.observe(duration, method, route, str(status_code))
+    request_sql_statements.observe(stats.sql_statements, method, route)
+    request_db_seconds.observe(stats.sql_seconds, method, route)
+    request_serialize_seconds.observe(stats.serialize_seconds, method, route)
+
+    if SLOW_REQUEST_MS and duration * 1000 >= SLOW_REQUEST_MS and random.random() < SLOW_REQUEST_SAMPLE_RATE:
+        sample = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "method": method,
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "sql_statements": stats.sql_statements,
+            "db_ms": round(stats.sql_seconds * 1000, 3),
+            "serialize_ms": round(stats.serialize_seconds * 1000, 3),
+        }
+        slow_requests.append(sample)
+        logger.warning(f"Slow request: {sample}")
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in (request_latency, request_sql_statements, request_db_seconds,
+                      request_serialize_seconds, ws_broadcast_latency):
+        lines.extend(histogram.render())
+    for prefix, source in stats_sources.items():
+        for key, value in source().items():
+            name = f"{prefix}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
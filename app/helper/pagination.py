@@ -0,0 +1,66 @@
+
+# Keyset (cursor) pagination for todo listings.
+# Instead of OFFSET, each page continues after the sort key of the last row returned, so every page
+# is a range scan on the (user_id, ..., id) indexes and page N costs the same as page 1.
+# Cursors are opaque to clients: urlsafe base64 of the order and the last row's sort key.
+# Pages are built from plain rows (see TODO_COLUMNS) and returned as dicts ready for orjson, skipping
+# ORM object loading and pydantic re-validation.
+
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import Row, tuple_
+
+from app.db.models import Todo
+
+
+class TodoOrder(str, Enum):
+    id = "id"
+    deadline = "deadline"
+
+
+def encode_cursor(todo: Row, order: TodoOrder) -> str:
+    if order == TodoOrder.deadline:
+        key = [order.value, todo.deadline.isoformat(), todo.id]
+    else:
+        key = [order.value, todo.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, order: TodoOrder) -> list:
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(key, list) or not key or key[0] != order.value:
+            raise invalid_cursor
+        if order == TodoOrder.deadline:
+            return [datetime.fromisoformat(key[1]), int(key[2])]
+        return [int(key[1])]
+    except (ValueError, TypeError, IndexError):
+        raise invalid_cursor
+
+
+def paginate(statement, order: TodoOrder, cursor: str, limit: int):
+    """Restrict a todo query to the page after the cursor (one extra row tells if more pages follow)"""
+    if order == TodoOrder.deadline:
+        if cursor:
+            deadline, todo_id = decode_cursor(cursor, order)
+            statement = statement.where(tuple_(Todo.deadline, Todo.id) > tuple_(deadline, todo_id))
+        statement = statement.order_by(Todo.deadline, Todo.id)
+    else:
+        if cursor:
+            (todo_id,) = decode_cursor(cursor, order)
+            statement = statement.where(Todo.id > todo_id)
+        statement = statement.order_by(Todo.id)
+    return statement.limit(limit + 1)
+
+
+def build_page(rows: Sequence[Row], order: TodoOrder, limit: int) -> dict:
+    """Turn the rows of a paginated query into a TodoPage-shaped dict"""
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1], order) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,84 @@
+
+# Cluster-wide presence for the WebSocket channel.
+# Each worker keeps the set of online users (with the workers holding a connection for each) and
+# turns joins and leaves into versioned deltas. Changes are collected over a short tick and only the
+# net result is sent, so a user who reconnects within the tick (e.g. during a deploy) produces no
+# traffic at all. New sockets get a capped snapshot and can page through the rest by user id.
+
+from bisect import bisect_right, insort
+from typing import Dict, List, Optional, Set
+
+
+class PresenceIndex:
+    def __init__(self):
+        # Format: {user_id: user dict}
+        self.users: Dict[int, dict] = {}
+        # Format: {user_id: {worker_id, ...}}, a user is online while any worker holds a connection
+        self._sources: Dict[int, Set[str]] = {}
+        # Format: {worker_id: {user_id, ...}}
+        self._worker_users: Dict[str, Set[int]] = {}
+        # Online user ids in order, for paging through snapshots
+        self._sorted_ids: List[int] = []
+        # Users changed since the last flush, with whether they were online at that flush
+        self._changes: Dict[int, bool] = {}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def add(self, worker_id: str, user: dict):
+        user_id = user["id"]
+        self._worker_users.setdefault(worker_id, set()).add(user_id)
+        sources = self._sources.get(user_id)
+        if sources is None:
+            self._changes.setdefault(user_id, False)
+            self._sources[user_id] = sources = set()
+            insort(self._sorted_ids, user_id)
+        sources.add(worker_id)
+        self.users[user_id] = user
+
+    def remove(self, worker_id: str, user_id: int):
+        self._worker_users.get(worker_id, set()).discard(user_id)
+        sources = self._sources.get(user_id)
+        if sources is None:
+            return
+        sources.discard(worker_id)
+        if not sources:
+            self._changes.setdefault(user_id, True)
+            del self._sources[user_id]
+            del self.users[user_id]
+            self._sorted_ids.pop(bisect_right(self._sorted_ids, user_id) - 1)
+
+    def replace_worker(self, worker_id: str, users: List[dict]):
+        """Apply a full snapshot of the users connected to one worker"""
+        current = {user["id"] for user in users}
+        for user_id in self._worker_users.get(worker_id, set()) - current:
+            self.remove(worker_id, user_id)
+        for user in users:
+            self.add(worker_id, user)
+
+    def drop_worker(self, worker_id: str):
+        for user_id in list(self._worker_users.pop(worker_id, ())):
+            self.remove(worker_id, user_id)
+
+    def flush(self) -> Optional[dict]:
+        """Net changes since the last flush as a new version, or None if nothing changed"""
+        changes, self._changes = self._changes, {}
+        joined = [self.users[user_id] for user_id, was_online in changes.items() if not was_online and user_id in self.users]
+        left = [user_id for user_id, was_online in changes.items() if was_online and user_id not in self.users]
+        if not joined and not left:
+            return None
+        self.version += 1
+        return {"version": self.version, "joined": joined, "left": left, "user_count": len(self.users)}
+
+    def page(self, cursor: Optional[int], limit: int) -> dict:
+        """Online users ordered by id, starting after the user id in cursor"""
+        start = bisect_right(self._sorted_ids, cursor) if cursor is not None else 0
+        ids = self._sorted_ids[start:start + limit]
+        next_cursor = ids[-1] if start + limit < len(self._sorted_ids) else None
+        return {
+            "version": self.version,
+            "users": [self.users[user_id] for user_id in ids],
+            "user_count": len(self.users),
+            "next_cursor": next_cursor,
+        }
@@ -0,0 +1,295 @@
+
+# Pub/sub backends that connect the ConnectionManagers of every worker (and every node).
+# A message is published once to the cluster and each worker delivers it to the sockets it holds.
+#
+# PUBSUB_BACKEND selects the backend:
+# - "memory" (default): single process, messages are handed straight back to the local manager
+# - "postgres": PostgreSQL LISTEN/NOTIFY, for several workers or nodes sharing one database; messages
+#   too large for a NOTIFY payload are stored in the pubsub_messages table and only their id is sent
+# - "socket": a local TCP hub (PUBSUB_SOCKET="host:port"), the first worker to bind the port relays
+#   for all others; meant for tests and multi-worker development without PostgreSQL
+
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Set
+
+from app.db.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")
+PUBSUB_URL = os.getenv("PUBSUB_URL")
+PUBSUB_CHANNEL = os.getenv("PUBSUB_CHANNEL", "todo_ws")
+PUBSUB_SOCKET = os.getenv("PUBSUB_SOCKET", "127.0.0.1:8765")
+# How often the postgres backend checks its connections, and waits between reconnect attempts
+PUBSUB_HEALTH_CHECK_SECONDS = float(os.getenv("PUBSUB_HEALTH_CHECK_SECONDS", "5"))
+
+# How long large messages stay in pubsub_messages for the other workers to fetch
+PUBSUB_STORED_MESSAGE_SECONDS = float(os.getenv("PUBSUB_STORED_MESSAGE_SECONDS", "60"))
+# Longest line the socket hub accepts (one message per line)
+PUBSUB_SOCKET_LINE_LIMIT = 16 * 1024 * 1024
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+POSTGRES_MAX_PAYLOAD = 7999
+
+POSTGRES_STORED_MESSAGES_DDL = """
+CREATE TABLE IF NOT EXISTS pubsub_messages (
+    id BIGSERIAL PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+MessageHandler = Callable[[dict], Awaitable[None]]
+
+
+class PubSubBackend:
+    """Interface for pub/sub backends, every published message reaches the handler of every worker"""
+
+    async def start(self, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def publish(self, message: dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class InProcessPubSub(PubSubBackend):
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+
+    async def publish(self, message: dict):
+        await self._handler(message)
+
+
+class PostgresPubSub(PubSubBackend):
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._listener = None
+        self._publisher = None
+        # asyncpg connections run one query at a time, the publisher also fetches stored messages
+        self._publish_lock = asyncio.Lock()
+        # Set when a connection is lost, wakes the watcher to reconnect
+        self._lost = asyncio.Event()
+        self._watch_task: Optional[asyncio.Task] = None
+        # Dispatch tasks, referenced until done so they are not garbage-collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        await self._connect()
+        self._watch_task = asyncio.create_task(self._watch())
+
+    async def _connect(self):
+        import asyncpg
+
+        listener = await asyncpg.connect(self.dsn)
+        publisher = None
+        try:
+            publisher = await asyncpg.connect(self.dsn)
+            try:
+                await publisher.execute(POSTGRES_STORED_MESSAGES_DDL)
+            except asyncpg.UniqueViolationError:
+                # Created by another worker starting at the same time
+                pass
+            for connection in (listener, publisher):
+                connection.add_termination_listener(self._on_terminated)
+            await listener.add_listener(self.channel, self._on_notify)
+        except Exception:
+            for connection in (listener, publisher):
+                if connection is not None:
+                    connection.terminate()
+            raise
+        self._listener, self._publisher = listener, publisher
+
+    async def _close(self):
+        for connection in (self._listener, self._publisher):
+            if connection is not None:
+                # Closing on purpose is not a lost connection
+                connection.remove_termination_listener(self._on_terminated)
+                try:
+                    await asyncio.wait_for(connection.close(), PUBSUB_HEALTH_CHECK_SECONDS)
+                except Exception:
+                    connection.terminate()
+        self._listener = self._publisher = None
+
+    def _on_terminated(self, connection):
+        self._lost.set()
+
+    async def _healthy(self) -> bool:
+        connections = (self._listener, self._publisher)
+        if any(connection is None or connection.is_closed() for connection in connections):
+            return False
+        try:
+            # The publisher is checked under the lock, asyncpg does not allow concurrent queries
+            await asyncio.wait_for(self._listener.execute("SELECT 1"), PUBSUB_HEALTH_CHECK_SECONDS)
+            async with self._publish_lock:
+                await asyncio.wait_for(self._publisher.execute("SELECT 1"), PUBSUB_HEALTH_CHECK_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def _watch(self):
+        """Reconnect and LISTEN again after a lost connection (database restart, failover)"""
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), PUBSUB_HEALTH_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if not self._lost.is_set() and await self._healthy():
+                await self._purge_stored_messages()
+                continue
+            logger.warning("Pub/sub database connection lost, reconnecting")
+            await self._close()
+            self._lost.clear()
+            try:
+                await self._connect()
+                logger.info("Pub/sub database connection restored")
+            except Exception as e:
+                logger.error(f"Error reconnecting to the pub/sub database: {e}")
+                self._lost.set()
+                await asyncio.sleep(PUBSUB_HEALTH_CHECK_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        task = asyncio.create_task(self._dispatch(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, payload: str):
+        try:
+            message = json.loads(payload)
+            if "stored_message_id" in message:
+                message = json.loads(await self._query("fetchval", (
+                    "SELECT payload FROM pubsub_messages WHERE id = $1", message["stored_message_id"]
+                )))
+            await self._handler(message)
+        except Exception as e:
+            logger.error(f"Error handling pub/sub message: {e}")
+
+    async def _query(self, method: str, args: tuple):
+        """Run a query on the publisher connection"""
+        publisher = self._publisher
+        if publisher is None:
+            raise ConnectionError("Pub/sub database connection is down")
+        async with self._publish_lock:
+            try:
+                return await getattr(publisher, method)(*args)
+            except Exception:
+                if publisher.is_closed():
+                    self._lost.set()
+                raise
+
+    async def publish(self, message: dict):
+        payload = json.dumps(message)
+        if len(payload.encode()) > POSTGRES_MAX_PAYLOAD:
+            # Store the message in one statement and notify its id
+            await self._query("execute", (
+                "WITH stored AS (INSERT INTO pubsub_messages (payload) VALUES ($2) RETURNING id) "
+                "SELECT pg_notify($1, json_build_object('stored_message_id', id)::text) FROM stored",
+                self.channel, payload,
+            ))
+            return
+        await self._query("execute", ("SELECT pg_notify($1, $2)", self.channel, payload))
+
+    async def _purge_stored_messages(self):
+        try:
+            await self._query("execute", (
+                "DELETE FROM pubsub_messages WHERE created_at < now() - make_interval(secs => $1)",
+                PUBSUB_STORED_MESSAGE_SECONDS,
+            ))
+        except Exception as e:
+            logger.error(f"Error purging stored pub/sub messages: {e}")
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+        await self._close()
+
+
+class SocketPubSub(PubSubBackend):
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(":")
+        self.host = host
+        self.port = int(port)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: List[asyncio.StreamWriter] = []
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        await self._connect()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _connect(self):
+        # Become the hub if nobody holds the port yet, then connect to the hub like every other worker
+        if self._server is None:
+            try:
+                self._server = await asyncio.start_server(
+                    self._serve_peer, self.host, self.port, limit=PUBSUB_SOCKET_LINE_LIMIT
+                )
+            except OSError:
+                self._server = None
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, limit=PUBSUB_SOCKET_LINE_LIMIT
+        )
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Hub side: relay every line from one peer to all peers"""
+        self._peers.append(writer)
+        try:
+            while line := await reader.readline():
+                for peer in list(self._peers):
+                    peer.write(line)
+                await asyncio.gather(*(peer.drain() for peer in self._peers), return_exceptions=True)
+        except (ConnectionError, asyncio.CancelledError):
+            # Peer dropped or the hub is shutting down
+            pass
+        finally:
+            self._peers.remove(writer)
+            writer.close()
+
+    async def _read_loop(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                # The hub went away, take over or reconnect to whoever did
+                logger.warning("Pub/sub hub connection lost, reconnecting")
+                await asyncio.sleep(0.5)
+                try:
+                    await self._connect()
+                except OSError as e:
+                    logger.error(f"Error reconnecting to pub/sub hub: {e}")
+                continue
+            try:
+                await self._handler(json.loads(line))
+            except Exception as e:
+                logger.error(f"Error handling pub/sub message: {e}")
+
+    async def publish(self, message: dict):
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+
+    async def stop(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+        if self._server:
+            self._server.close()
+
+
+def create_pubsub_backend() -> PubSubBackend:
+    if PUBSUB_BACKEND == "postgres":
+        # asyncpg takes plain postgresql:// DSNs without a driver suffix
+        dsn = PUBSUB_URL or DATABASE_URL.replace("+asyncpg", "").replace("+psycopg2", "")
+        return PostgresPubSub(dsn, PUBSUB_CHANNEL)
+    if PUBSUB_BACKEND == "socket":
+        return SocketPubSub(PUBSUB_SOCKET)
+    return InProcessPubSub()
@@ -0,0 +1,266 @@
+
+# Deadline reminders pushed over WebSocket (a "todo_due" message to the owner) when a todo's deadline arrives.
+# Each worker keeps a min-heap of the deadlines due within the next REMINDER_WINDOW_SECONDS. It is filled by
+# range scans on the (done, deadline, id) index that only cover the part of the window not loaded yet, and
+# kept current by the todo events this worker publishes (see todo_event_listeners), so a new, moved or
+# reopened deadline inside the window fires on time without polling.
+# The heap only decides when to wake up. What to send is read from the database at that moment, so edits
+# made through other workers are respected, and the reminders are claimed by advancing the persisted
+# watermark (reminder_state) with a compare-and-set: with several workers each reminder is sent once, and
+# after a restart the scheduler resumes from the watermark instead of scanning the whole table.
+# Deadlines are compared with UTC now, the same way they are stored.
+
+import asyncio
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.database import engine
+from app.db.models import ReminderState, Todo, to_utc
+from app.helper.broadcast import send_message_to_user
+from app.helper.todo_events import todo_event_listeners
+
+logger = logging.getLogger(__name__)
+
+# How far ahead deadlines are loaded into memory
+REMINDER_WINDOW_SECONDS = float(os.getenv("REMINDER_WINDOW_SECONDS", "3600"))
+# How often the window is extended, and the longest a worker sleeps without looking at the database
+REMINDER_SCAN_SECONDS = float(os.getenv("REMINDER_SCAN_SECONDS", "60"))
+# Reminders claimed and sent per database round trip
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Deadlines that passed longer ago than this while no worker was running are skipped
+REMINDER_MAX_LATE_SECONDS = float(os.getenv("REMINDER_MAX_LATE_SECONDS", "3600"))
+
+# Larger than any todo id (todos.id is a 32-bit integer on PostgreSQL), so (t, MAX_TODO_ID) covers all of t
+MAX_TODO_ID = 2**31 - 1
+
+
+class ReminderScheduler:
+    def __init__(self):
+        # Format: [(deadline, todo_id), ...], entries no longer matching _pending are skipped when popped
+        self._heap: List[Tuple[datetime, int]] = []
+        # Format: {todo_id: deadline}
+        self._pending: Dict[int, datetime] = {}
+        # Reminders up to (deadline, todo_id) have been sent
+        self.watermark: Optional[Tuple[datetime, int]] = None
+        # Deadlines up to this time have been loaded into the heap
+        self.horizon: Optional[datetime] = None
+        # Reopened todos, their deadlines are not in the event and are looked up by the loop
+        self._reopened: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+
+    # -- in-memory schedule --
+
+    def schedule(self, todo_id: int, deadline: datetime):
+        """Add or move a pending deadline, ignored when it is outside the loaded window"""
+        if self.horizon is None or deadline > self.horizon or (deadline, todo_id) <= self.watermark:
+            self.cancel(todo_id)
+            return
+        if self._pending.get(todo_id) == deadline:
+            return
+        self._pending[todo_id] = deadline
+        heapq.heappush(self._heap, (deadline, todo_id))
+        if self._heap[0] == (deadline, todo_id):
+            # Earlier than whatever the loop is sleeping for
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, todo_id: int):
+        # The heap entry stays until it is popped or compacted away
+        self._pending.pop(todo_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        heap = self._heap
+        while heap and self._pending.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._pending) + 1024:
+            self._heap = [(deadline, todo_id) for todo_id, deadline in self._pending.items()]
+            heapq.heapify(self._heap)
+
+    def _forget_until(self, watermark: Tuple[datetime, int]):
+        """Drop pending entries the watermark has moved past"""
+        heap = self._heap
+        while heap and heap[0] <= watermark:
+            deadline, todo_id = heapq.heappop(heap)
+            if self._pending.get(todo_id) == deadline:
+                del self._pending[todo_id]
+
+    def on_todo_event(self, event: dict):
+        """Keep the schedule in step with the changes published by this worker"""
+        kind = event["type"]
+        if kind == "todo_batch":
+            for item in event["events"]:
+                self.on_todo_event(item)
+        elif kind == "todo_created":
+            todo = event["todo"]
+            deadline = to_utc(todo.get("deadline"))
+            if deadline is not None and not todo.get("done"):
+                self.schedule(todo["id"], deadline)
+        elif kind == "todo_updated":
+            changes = event["changes"]
+            if changes.get("done"):
+                self.cancel(event["todo_id"])
+            elif "deadline" in changes:
+                deadline = to_utc(changes["deadline"])
+                if deadline is not None:
+                    self.schedule(event["todo_id"], deadline)
+            elif changes.get("done") is False:
+                # The next scan only covers deadlines past the horizon, so reopened todos are looked up now
+                self._reopened.add(event["todo_id"])
+                self._wakeup.set()
+        elif kind == "todo_deleted":
+            self.cancel(event["todo_id"])
+
+    # -- database --
+
+    async def load_watermark(self, db: AsyncSession):
+        state = await db.get(ReminderState, 1, populate_existing=True)
+        if state is None:
+            # First run: deadlines that have already passed are not reminded
+            state = ReminderState(id=1, watermark_deadline=datetime.utcnow(), watermark_todo_id=0)
+            db.add(state)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Created by another worker starting at the same time
+                await db.rollback()
+                state = await db.get(ReminderState, 1, populate_existing=True)
+        self.watermark = (state.watermark_deadline, state.watermark_todo_id)
+
+    async def scan(self, db: AsyncSession):
+        """Load the deadlines between the current horizon (or the watermark) and the end of the window"""
+        start = self.watermark if self.horizon is None else (self.horizon, MAX_TODO_ID)
+        horizon = datetime.utcnow() + timedelta(seconds=REMINDER_WINDOW_SECONDS)
+        statement = select(Todo.id, Todo.deadline).where(
+            Todo.done == False,
+            tuple_(Todo.deadline, Todo.id) > tuple_(*start),
+            Todo.deadline <= horizon,
+        )
+        rows = (await db.exec(statement)).all()
+        self.horizon = horizon
+        for todo_id, deadline in rows:
+            self.schedule(todo_id, deadline)
+
+    async def load_reopened(self, db: AsyncSession):
+        """Schedule the reopened todos whose deadlines are inside the loaded window"""
+        todo_ids, self._reopened = self._reopened, set()
+        if self.horizon is None:
+            # Not loaded yet, the first scan covers them
+            return
+        statement = select(Todo.id, Todo.deadline).where(
+            Todo.id.in_(todo_ids),
+            Todo.done == False,
+            Todo.deadline <= self.horizon,
+        )
+        for todo_id, deadline in (await db.exec(statement)).all():
+            self.schedule(todo_id, deadline)
+
+    async def fire(self, db: AsyncSession) -> bool:
+        """Claim and send one batch of due reminders, returns True when there may be more"""
+        now = datetime.utcnow()
+        start = self.watermark
+        late = now - timedelta(seconds=REMINDER_MAX_LATE_SECONDS)
+        if start[0] < late:
+            start = (late, 0)
+        statement = (
+            select(Todo.id, Todo.user_id, Todo.description, Todo.deadline)
+            .where(
+                Todo.done == False,
+                tuple_(Todo.deadline, Todo.id) > tuple_(*start),
+                Todo.deadline <= now,
+            )
+            .order_by(Todo.deadline, Todo.id)
+            .limit(REMINDER_BATCH_SIZE)
+        )
+        rows = (await db.exec(statement)).all()
+        full = len(rows) == REMINDER_BATCH_SIZE
+        # A full batch may end in the middle of the due reminders, otherwise everything up to now is done
+        new_watermark = (rows[-1].deadline, rows[-1].id) if full else (now, MAX_TODO_ID)
+
+        # Only the worker whose update matches the old watermark sends this batch
+        statement = (
+            update(ReminderState)
+            .where(
+                ReminderState.id == 1,
+                ReminderState.watermark_deadline == self.watermark[0],
+                ReminderState.watermark_todo_id == self.watermark[1],
+            )
+            .values(watermark_deadline=new_watermark[0], watermark_todo_id=new_watermark[1])
+        )
+        claimed = (await db.execute(statement)).rowcount == 1
+        await db.commit()
+        if not claimed:
+            # Another worker got there first, continue from its watermark
+            await self.load_watermark(db)
+            self._forget_until(self.watermark)
+            return self.watermark[0] < now
+
+        self.watermark = new_watermark
+        self._forget_until(new_watermark)
+        for row in rows:
+            await send_message_to_user(row.user_id, {
+                "type": "todo_due",
+                "todo_id": row.id,
+                "description": row.description,
+                "deadline": row.deadline.isoformat(),
+                "timestamp": now.isoformat(),
+            })
+        self.sent += len(rows)
+        return full
+
+    # -- loop --
+
+    async def run(self):
+        next_scan = datetime.utcnow()
+
+        while True:
+            now = datetime.utcnow()
+            wake_at = min(filter(None, [self.next_deadline(), next_scan]))
+            if wake_at > now and not self._reopened:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), (wake_at - now).total_seconds())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as db:
+                    if self.watermark is None:
+                        await self.load_watermark(db)
+                    if self._reopened:
+                        await self.load_reopened(db)
+                    # Periodic runs also pick up reminders that only other workers had scheduled
+                    while await self.fire(db):
+                        pass
+                    if now >= next_scan:
+                        await self.scan(db)
+                        next_scan = now + timedelta(seconds=REMINDER_SCAN_SECONDS)
+            except Exception as e:
+                logger.error(f"Error sending deadline reminders: {e}")
+                await asyncio.sleep(REMINDER_SCAN_SECONDS)
+                next_scan = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "heap_size": len(self._heap),
+            "reopened": len(self._reopened),
+            "sent": self.sent,
+        }
+
+
+# Global scheduler, fed by this worker's todo events
+reminder_scheduler = ReminderScheduler()
+todo_event_listeners.append(reminder_scheduler.on_todo_event)
@@ -0,0 +1,114 @@
+
+# In-memory cache of revoked (blacklisted) tokens, keyed by the token's jti claim.
+# Authentication checks this cache instead of querying the BlacklistedToken table on every request.
+# It is loaded at startup, updated by /logout and periodically synced so logouts handled by other workers show up too.
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.database import engine
+from app.db.models import BlacklistedToken
+
+logger = logging.getLogger(__name__)
+
+# How often each worker pulls tokens blacklisted by other workers
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# How often expired rows are deleted from the blacklist table
+TOKEN_PURGE_SECONDS = float(os.getenv("TOKEN_PURGE_SECONDS", "300"))
+
+
+class RevocationCache:
+    def __init__(self):
+        # Format: {jti: token expiry}
+        self._revoked: Dict[str, datetime] = {}
+        self._synced_at: Optional[datetime] = None
+
+    def add(self, jti: str, expires_at: datetime):
+        """Mark a token as revoked until it expires"""
+        if expires_at <= datetime.utcnow():
+            # Expired tokens are rejected by jwt.decode anyway
+            return
+        self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        """Check whether a token has been revoked"""
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= datetime.utcnow():
+            del self._revoked[jti]
+            return False
+        return True
+
+    def prune(self):
+        """Drop entries for tokens that have expired"""
+        now = datetime.utcnow()
+        for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[jti]
+
+    async def sync(self, db: AsyncSession):
+        """Load tokens blacklisted since the last sync (or all live ones on the first call)"""
+        started_at = datetime.utcnow()
+        statement = select(BlacklistedToken.jti, BlacklistedToken.expires_at).where(
+            BlacklistedToken.expires_at > started_at
+        )
+        if self._synced_at is not None:
+            # Overlap the window so rows written by workers with slightly skewed clocks are not missed
+            since = self._synced_at - timedelta(seconds=2 * REVOCATION_SYNC_SECONDS)
+            statement = statement.where(BlacklistedToken.blacklisted_on >= since)
+        for jti, expires_at in (await db.exec(statement)).all():
+            self.add(jti, expires_at)
+        self._synced_at = started_at
+        self.prune()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+# Global revocation cache instance
+revocation_cache = RevocationCache()
+
+
+async def purge_expired_tokens(db: AsyncSession) -> int:
+    """Delete blacklist rows for tokens that have already expired"""
+    result = await db.execute(delete(BlacklistedToken).where(BlacklistedToken.expires_at <= datetime.utcnow()))
+    await db.commit()
+    return result.rowcount
+
+
+async def load_revocation_cache():
+    """Fill the cache from the database (called at startup)"""
+    async with AsyncSession(engine) as db:
+        await revocation_cache.sync(db)
+    logger.info(f"Loaded {len(revocation_cache)} revoked tokens")
+
+
+async def run_revocation_sync():
+    """Background task that keeps the cache in step with the database"""
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+        try:
+            async with AsyncSession(engine) as db:
+                await revocation_cache.sync(db)
+        except Exception as e:
+            logger.error(f"Error syncing revoked tokens: {e}")
+
+
+async def run_token_purge():
+    """Background task that keeps the blacklist table down to live revoked tokens"""
+    while True:
+        try:
+            async with AsyncSession(engine) as db:
+                purged = await purge_expired_tokens(db)
+            if purged:
+                logger.info(f"Purged {purged} expired blacklisted tokens")
+        except Exception as e:
+            logger.error(f"Error purging blacklisted tokens: {e}")
+        await asyncio.sleep(TOKEN_PURGE_SECONDS)
@@ -0,0 +1,99 @@
+
+# Todo change events pushed over WebSocket, so clients can apply deltas instead of re-polling lists.
+# Each event carries the owner's todos_version after the change as its sequence number ("seq"):
+# it is per user, increases by one per write and is shared by all workers through the database.
+# Every worker keeps the latest events per user so a reconnecting client can resume from the last
+# seq it saw; when the gap is no longer covered it is told to reload instead.
+
+import os
+from bisect import insort
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+# Events kept per user for resuming
+TODO_EVENT_BUFFER = int(os.getenv("TODO_EVENT_BUFFER", "256"))
+# Users whose events are kept (least recently written users are forgotten first)
+TODO_EVENT_USERS = int(os.getenv("TODO_EVENT_USERS", "10000"))
+# Size of the events kept per user and in total, in characters of serialized JSON
+TODO_EVENT_BUFFER_BYTES = int(os.getenv("TODO_EVENT_BUFFER_BYTES", str(512 * 1024)))
+TODO_EVENT_MAX_BYTES = int(os.getenv("TODO_EVENT_MAX_BYTES", str(128 * 1024 * 1024)))
+
+
+class TodoEventLog:
+    """Bounded per-user replay buffer of serialized events, ordered by seq"""
+
+    def __init__(
+        self,
+        per_user: int = TODO_EVENT_BUFFER,
+        max_users: int = TODO_EVENT_USERS,
+        per_user_bytes: int = TODO_EVENT_BUFFER_BYTES,
+        max_bytes: int = TODO_EVENT_MAX_BYTES,
+    ):
+        self.per_user = per_user
+        self.max_users = max_users
+        self.per_user_bytes = per_user_bytes
+        self.max_bytes = max_bytes
+        # Format: {user_id: [(seq, message), ...]}
+        self._events: "OrderedDict[int, List[Tuple[int, str]]]" = OrderedDict()
+        # Format: {user_id: size of their buffered messages}
+        self._sizes: Dict[int, int] = {}
+        self.total_bytes = 0
+
+    def append(self, user_id: int, seq: int, message: str):
+        events = self._events.pop(user_id, [])
+        self._events[user_id] = events
+        # Writes commit in order but their events may be published out of order
+        insort(events, (seq, message))
+        old_size = self._sizes.get(user_id, 0)
+        size = old_size + len(message)
+        # Oldest events are forgotten first, an event larger than the whole buffer is not kept at all
+        while events and (len(events) > self.per_user or size > self.per_user_bytes):
+            size -= len(events.pop(0)[1])
+        self._sizes[user_id] = size
+        self.total_bytes += size - old_size
+        while self._events and (len(self._events) > self.max_users or self.total_bytes > self.max_bytes):
+            evicted_user_id, _ = self._events.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(evicted_user_id)
+
+    def since(self, user_id: int, seq: int, current: int) -> Optional[List[str]]:
+        """Events after seq up to current, or None if some of them are no longer (or not yet) buffered"""
+        events = [message for event_seq, message in self._events.get(user_id, ()) if seq < event_seq <= current]
+        if len(events) != current - seq:
+            return None
+        return events
+
+    def clear(self):
+        self._events.clear()
+        self._sizes.clear()
+        self.total_bytes = 0
+
+
+# Global event log, filled from the pub/sub bus on every worker
+todo_event_log = TodoEventLog()
+
+# Called with every event published by this worker, before it is serialized
+todo_event_listeners: List[Callable[[dict], None]] = []
+
+
+def serialize_event(seq: int, event: dict) -> str:
+    return orjson.dumps({**event, "seq": seq}).decode()
+
+
+def todo_created_event(todo: dict) -> dict:
+    return {"type": "todo_created", "todo": todo}
+
+
+def todo_updated_event(todo_id: int, changes: dict) -> dict:
+    """Only the fields that changed are sent"""
+    return {"type": "todo_updated", "todo_id": todo_id, "changes": changes}
+
+
+def todo_deleted_event(todo_id: int) -> dict:
+    return {"type": "todo_deleted", "todo_id": todo_id}
+
+
+def todo_batch_event(events: List[dict]) -> dict:
+    """Changes made by one bulk request, which share a single seq"""
+    return {"type": "todo_batch", "events": events}
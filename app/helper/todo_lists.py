@@ -0,0 +1,40 @@
+
+# Serving pipeline shared by the todo list endpoints:
+# version lookup -> 304 if the client's ETag is current -> cached page -> query and cache the page.
+
+import time
+from typing import Awaitable, Callable, Hashable, Tuple
+
+import orjson
+from fastapi import Request, Response, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.helper.cache import response_cache
+from app.helper.metrics import record_serialization
+from app.helper.todo_versions import etag_matches, get_todos_version, todos_etag
+
+
+async def serve_todo_page(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    page_key: Tuple[Hashable, ...],
+    load_page: Callable[[], Awaitable[dict]],
+) -> Response:
+    """Answer a list request from the client's copy, the response cache or the database, in that order"""
+    version = await get_todos_version(db, user_id)
+    etag = todos_etag(user_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = (user_id, version) + page_key
+    body = response_cache.get(key)
+    if body is None:
+        # Pages are plain dicts of TodoRead columns, encoded directly without pydantic validation
+        page = await load_page()
+        started = time.perf_counter()
+        body = orjson.dumps(page)
+        record_serialization(time.perf_counter() - started)
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
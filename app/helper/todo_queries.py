@@ -0,0 +1,102 @@
+
+# Single-statement todo mutations.
+# Updates and deletes are conditioned on both the todo id and the owner, so the success path is one
+# round trip (UPDATE ... RETURNING where the backend supports it). Only when no row matched is the
+# todo looked up again, to tell "not found" apart from "not yours".
+# They also report how the owner's todo counts changed, for bump_todos_version.
+
+from typing import Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Todo
+
+# Columns of a todo, loaded as plain rows rather than ORM objects
+TODO_COLUMNS = (Todo.id, Todo.description, Todo.deadline, Todo.done, Todo.user_id)
+
+
+async def raise_not_found_or_forbidden(db: AsyncSession, todo_id: int, action: str):
+    """Called after a conditional statement matched nothing"""
+    owner_id = (await db.exec(select(Todo.user_id).where(Todo.id == todo_id))).first()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    raise HTTPException(status_code=403, detail=f"Not authorized to {action} this todo")
+
+
+async def _update_todo(db: AsyncSession, owned: tuple, conditions: tuple, values: dict):
+    """Apply values to the owned todo if it also matches conditions, return the updated row or None"""
+    statement = (
+        update(Todo).where(*owned, *conditions).values(**values).execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.update_returning:
+        return (await db.execute(statement.returning(*TODO_COLUMNS))).first()
+    # Fallback for backends without UPDATE ... RETURNING
+    result = await db.execute(statement)
+    if not result.rowcount:
+        return None
+    return (await db.exec(select(*TODO_COLUMNS).where(*owned))).first()
+
+
+async def _update_todo_done(db: AsyncSession, owned: tuple, values: dict):
+    """Apply values including done to the owned todo, return the updated row (or None) and the change in done todos"""
+    new_done = values["done"]
+    if db.bind.dialect.name == "postgresql":
+        # One statement: the CTE locks the row and keeps its old status, so concurrent requests
+        # flipping the same todo each see the status the other one left behind
+        old_todo = select(Todo.id, Todo.done).where(*owned).with_for_update().cte("old_todo")
+        statement = (
+            update(Todo)
+            .where(Todo.id == old_todo.c.id)
+            .values(**values)
+            .returning(*TODO_COLUMNS, old_todo.c.done.label("was_done"))
+            .execution_options(synchronize_session=False)
+        )
+        row = (await db.execute(statement)).first()
+        if row is None:
+            return None, 0
+        return row, int(new_done) - int(row.was_done)
+
+    # Only matches when the status flips, so concurrent requests cannot count the same change twice
+    row = await _update_todo(db, owned, (Todo.done != new_done,), values)
+    if row is not None:
+        return row, 1 if new_done else -1
+    return await _update_todo(db, owned, (), values), 0
+
+
+async def update_owned_todo(db: AsyncSession, todo_id: int, user_id: int, values: dict) -> Tuple[dict, int]:
+    """Apply values to a todo owned by user_id (not committed), return the row and the change in done todos"""
+    owned = (Todo.id == todo_id, Todo.user_id == user_id)
+    done = 0
+    if not values:
+        row = (await db.exec(select(*TODO_COLUMNS).where(*owned))).first()
+    elif "done" in values:
+        row, done = await _update_todo_done(db, owned, values)
+    else:
+        row = await _update_todo(db, owned, (), values)
+
+    if row is None:
+        await raise_not_found_or_forbidden(db, todo_id, "update")
+    row = dict(row._mapping)
+    row.pop("was_done", None)
+    return row, done
+
+
+async def delete_owned_todo(db: AsyncSession, todo_id: int, user_id: int) -> bool:
+    """Delete a todo owned by user_id (not committed), returns whether it was done"""
+    owned = (Todo.id == todo_id, Todo.user_id == user_id)
+    statement = delete(Todo).where(*owned).execution_options(synchronize_session=False)
+    if db.bind.dialect.delete_returning:
+        done = (await db.execute(statement.returning(Todo.done))).scalar()
+        if done is None:
+            await raise_not_found_or_forbidden(db, todo_id, "delete")
+        return done
+
+    # Fallback for backends without DELETE ... RETURNING
+    done = (await db.exec(select(Todo.done).where(*owned))).first()
+    if done is None:
+        await raise_not_found_or_forbidden(db, todo_id, "delete")
+    await db.execute(statement)
+    return done
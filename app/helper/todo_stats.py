@@ -0,0 +1,122 @@
+
+# Per-user todo statistics.
+# users.todos_total and users.todos_done are changed by bump_todos_version in the same transaction as every
+# todo write, so /todos/stats reads one user row instead of counting the user's todos. Overdue depends on the
+# current time and cannot be kept as a counter; it is counted on the (user_id, done, deadline) index, which
+# only visits the user's overdue todos.
+# The repair job recomputes the counters from todos and fixes any that drifted (after an upgrade, or when
+# bulk edits of the same todos raced). It only writes a user's counters while their todos_version is
+# unchanged, so a write committed during the repair is never overwritten with stale counts.
+# Only one worker runs each repair: the workers poll todo_stats_repair_state and the one whose update moves
+# last_run forward does the work, so restarts and extra workers do not repeat it.
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.database import engine
+from app.db.models import Todo, TodoStats, TodoStatsRepairState, User
+
+logger = logging.getLogger(__name__)
+
+# How often the counters are recomputed (by one worker, the first run is when the app is first started)
+TODO_STATS_REPAIR_SECONDS = float(os.getenv("TODO_STATS_REPAIR_SECONDS", "3600"))
+# How often each worker checks whether a repair is due
+TODO_STATS_REPAIR_POLL_SECONDS = min(TODO_STATS_REPAIR_SECONDS, 60)
+# Users checked per transaction by the repair job
+TODO_STATS_REPAIR_BATCH = int(os.getenv("TODO_STATS_REPAIR_BATCH", "1000"))
+
+
+async def get_todo_stats(db: AsyncSession, user_id: int) -> TodoStats:
+    statement = select(User.todos_total, User.todos_done).where(User.id == user_id)
+    # A replica that has not caught up with the signup yet has no row, and no todos either
+    total, done = (await db.exec(statement)).first() or (0, 0)
+    statement = select(func.count()).select_from(Todo).where(
+        Todo.user_id == user_id,
+        Todo.done == False,
+        Todo.deadline < datetime.utcnow(),
+    )
+    overdue = (await db.exec(statement)).one()
+    return TodoStats(total=total, done=done, pending=total - done, overdue=overdue)
+
+
+async def repair_todo_stats(db: AsyncSession) -> int:
+    """Recompute every user's todo counters, returns the number of users that were corrected"""
+    repaired = 0
+    last_id = 0
+    while True:
+        # Versions are read before the counts, a write committed in between changes the version
+        statement = (
+            select(User.id, User.todos_version, User.todos_total, User.todos_done)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(TODO_STATS_REPAIR_BATCH)
+        )
+        users = (await db.exec(statement)).all()
+        if not users:
+            return repaired
+        last_id = users[-1].id
+
+        statement = (
+            select(Todo.user_id, func.count(), func.sum(case((Todo.done == True, 1), else_=0)))
+            .where(Todo.user_id.in_([user.id for user in users]))
+            .group_by(Todo.user_id)
+        )
+        counts = {user_id: (total, done) for user_id, total, done in (await db.exec(statement)).all()}
+
+        for user in users:
+            total, done = counts.get(user.id, (0, 0))
+            if (total, done) == (user.todos_total, user.todos_done):
+                continue
+            statement = (
+                update(User)
+                .where(User.id == user.id, User.todos_version == user.todos_version)
+                .values(todos_total=total, todos_done=done)
+            )
+            repaired += (await db.execute(statement)).rowcount
+        await db.commit()
+
+
+async def claim_todo_stats_repair(db: AsyncSession) -> bool:
+    """Returns True when this worker should run the repair now"""
+    if await db.get(TodoStatsRepairState, 1) is None:
+        # First run: the repair is due straight away
+        db.add(TodoStatsRepairState(id=1, last_run=datetime(1970, 1, 1)))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Created by another worker starting at the same time
+            await db.rollback()
+    now = datetime.utcnow()
+    # Only the worker whose update moves last_run forward runs this repair
+    statement = (
+        update(TodoStatsRepairState)
+        .where(
+            TodoStatsRepairState.id == 1,
+            TodoStatsRepairState.last_run <= now - timedelta(seconds=TODO_STATS_REPAIR_SECONDS),
+        )
+        .values(last_run=now)
+    )
+    claimed = (await db.execute(statement)).rowcount == 1
+    await db.commit()
+    return claimed
+
+
+# Background loop, started with the app
+async def run_todo_stats_repair():
+    while True:
+        try:
+            async with AsyncSession(engine) as db:
+                if await claim_todo_stats_repair(db):
+                    repaired = await repair_todo_stats(db)
+                    if repaired:
+                        logger.warning(f"Repaired the todo stats of {repaired} users")
+        except Exception as e:
+            logger.error(f"Error repairing todo stats: {e}")
+        await asyncio.sleep(TODO_STATS_REPAIR_POLL_SECONDS)
@@ -0,0 +1,59 @@
+
+# Per-user todo version counter and conditional GET support.
+# Every todo write bumps users.todos_version in the same transaction, list responses carry an ETag
+# derived from it, and a request whose If-None-Match still matches gets 304 Not Modified without
+# running the todo query (see app.helper.todo_lists).
+# The same UPDATE applies the changes to the user's todo counters (see app.helper.todo_stats).
+
+from typing import Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import User
+from app.db.replicas import replica_set
+from app.helper.cache import response_cache
+
+
+async def bump_todos_version(db: AsyncSession, user_id: int, total: int = 0, done: int = 0) -> int:
+    """Increment a user's todo version and add to their todo counts (not committed), return the new version"""
+    # Pages cached under the old version can no longer be served, free them
+    response_cache.invalidate(user_id)
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            todos_version=User.todos_version + 1,
+            todos_total=User.todos_total + total,
+            todos_done=User.todos_done + done,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.update_returning:
+        version = (await db.execute(statement.returning(User.todos_version))).scalar_one()
+    else:
+        # Fallback for backends without UPDATE ... RETURNING
+        await db.execute(statement)
+        version = await get_todos_version(db, user_id)
+    # Keep this user's reads off replicas that have not reached this version
+    replica_set.note_write(user_id, version)
+    return version
+
+
+async def get_todos_version(db: AsyncSession, user_id: int) -> int:
+    # A replica that has not caught up with the signup yet has no row, and no todos either
+    return (await db.exec(select(User.todos_version).where(User.id == user_id))).first() or 0
+
+
+def todos_etag(user_id: int, version: int) -> str:
+    return f'W/"todos-{user_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
@@ -0,0 +1,93 @@
+
+# Bounded TTL/LRU cache of authenticated user identities, keyed by the token subject (email).
+# It saves the User lookup that every authenticated request would otherwise make.
+# Entries are dropped when a User row is updated or deleted through the ORM, and expire after a TTL
+# so changes made by other workers are picked up.
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import User, UserRead
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Format: {email: (expires_at, user)}, least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, UserRead]]" = OrderedDict()
+        # Format: {user_id: email}
+        self._emails: Dict[int, str] = {}
+
+    def get(self, email: str) -> Optional[UserRead]:
+        """Return the cached user for a token subject, if present and fresh"""
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(email)
+            return None
+        self._entries.move_to_end(email)
+        return user
+
+    def set(self, user: UserRead):
+        """Cache a user, evicting the least recently used entry when full"""
+        self._entries[user.email] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.email)
+        self._emails[user.id] = user.email
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id: int):
+        """Forget a user, e.g. after their row changed"""
+        email = self._emails.get(user_id)
+        if email is not None:
+            self._remove(email)
+
+    def clear(self):
+        self._entries.clear()
+        self._emails.clear()
+
+    def _remove(self, email: str):
+        entry = self._entries.pop(email, None)
+        if entry is not None and self._emails.get(entry[1].id) == email:
+            del self._emails[entry[1].id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global user cache instance
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserRead]:
+    """Look up a user's identity, going to the database only on a cache miss"""
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    statement = select(User.id, User.name, User.email).where(User.email == email)
+    row = (await db.exec(statement)).first()
+    if row is None:
+        return None
+    user = UserRead(id=row.id, name=row.name, email=row.email)
+    user_cache.set(user)
+    return user
+
+
+# Drop cached identities whenever a user changes
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User):
+    user_cache.invalidate(target.id)
@@ -1,17 +1,56 @@
+import asyncio
+
 from fastapi import FastAPI
 
 from app.api import routes
 
-from .db.database import create_db_and_tables
+from .db.database import create_db_and_tables, warm_up_pool
+from .db.replicas import ReadYourWritesMiddleware, replica_set, run_replica_health_checks
+from .helper.broadcast import manager
+from .helper.cache import response_cache
+from .helper.hashing import hash_pool
+from .helper.metrics import MetricsMiddleware, register_stats
+from .helper.reminders import reminder_scheduler
+from .helper.responses import ORJSONResponse
+from .helper.revocation import load_revocation_cache, run_revocation_sync, run_token_purge
+from .helper.todo_stats import run_todo_stats_repair
 
 
 # Create FastAPI app
-app = FastAPI(title="Todo", description="todo app built with fastapi")
+app = FastAPI(title="Todo", description="todo app built with fastapi", default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Component stats exported as gauges on /metrics
+register_stats("hash_pool", hash_pool.stats)
+register_stats("response_cache", response_cache.stats)
+register_stats("ws", manager.stats)
+register_stats("db_replicas", replica_set.stats)
+register_stats("reminders", reminder_scheduler.stats)
+
 
+app.include_router(routes.router)
 
-app.include_router(routes.router)   
+# Background tasks started with the app and cancelled on shutdown
+background_tasks = []
 
 @app.on_event("startup")
 async def on_startup():
-    create_db_and_tables()
+    await create_db_and_tables()
+    await warm_up_pool()
+    await load_revocation_cache()
+    await manager.start()
+    background_tasks.append(asyncio.create_task(run_revocation_sync()))
+    background_tasks.append(asyncio.create_task(run_token_purge()))
+    background_tasks.append(asyncio.create_task(run_replica_health_checks()))
+    background_tasks.append(asyncio.create_task(reminder_scheduler.run()))
+    background_tasks.append(asyncio.create_task(run_todo_stats_repair()))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await manager.stop()
 
@@ -0,0 +1,274 @@
+
+# Load and latency benchmark of the HTTP API and the WebSocket channel.
+# Boots app.main:app with uvicorn against a scratch SQLite database (or the database given with
+# --database-url), seeds users and todos, then drives each endpoint with concurrent clients and prints
+# requests per second and latency percentiles per endpoint as JSON, so runs can be compared.
+# Environment variables of the app (BCRYPT_ROUNDS, RESPONSE_CACHE_SIZE, ...) are passed through.
+#
+# Needs httpx and websockets: pip install httpx websockets
+#
+# Usage: python -m benchmarks.load [--users 10] [--todos 1000] [--requests 500] [--concurrency 20]
+#        [--ws-clients 50] [--ws-messages 20] [--database-url postgresql://...] [--output results.json]
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+import websockets
+
+from app.db.models import BULK_MAX_ITEMS
+
+PASSWORD = "bench-password"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_scenario(requests: int, concurrency: int, send: Callable[[int], Awaitable[httpx.Response]]) -> dict:
+    """Send requests numbered 0..requests-1 from concurrent workers and time each one"""
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for number in numbers:
+            started = time.perf_counter()
+            try:
+                response = await send(number)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.setdefault("SECRET_KEY", "benchmark-secret")
+    env.setdefault("ALGORITHM", "HS256")
+    # Derive the async URL from DATABASE_URL instead of a stale override
+    env.pop("ASYNC_DATABASE_URL", None)
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            await client.get("/docs")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def seed(client: httpx.AsyncClient, users: int, todos: int) -> List[Tuple[str, str]]:
+    """Create users with todos, returns (email, token) per user"""
+    accounts = []
+    deadline = datetime(2030, 1, 1)
+    for i in range(users):
+        email = f"bench{i}@example.com"
+        # Already registered when reusing a database
+        await client.post("/register", json={"name": f"bench{i}", "email": email, "password": PASSWORD})
+        response = await client.post("/token", data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        accounts.append((email, token))
+
+        headers = {"Authorization": f"Bearer {token}"}
+        for start in range(0, todos, BULK_MAX_ITEMS):
+            items = [
+                {"description": f"todo {n}", "deadline": (deadline + timedelta(hours=n)).isoformat(), "done": n % 3 == 0}
+                for n in range(start, min(start + BULK_MAX_ITEMS, todos))
+            ]
+            response = await client.post("/todos/bulk", json={"items": items}, headers=headers)
+            response.raise_for_status()
+    return accounts
+
+
+async def http_scenarios(client: httpx.AsyncClient, accounts: List[Tuple[str, str]], requests: int, concurrency: int) -> Dict[str, dict]:
+    headers = [{"Authorization": f"Bearer {token}"} for _, token in accounts]
+
+    def auth(number: int) -> dict:
+        return headers[number % len(headers)]
+
+    results = {}
+    results["POST /token"] = await run_scenario(requests, concurrency, lambda n: client.post(
+        "/token", data={"username": accounts[n % len(accounts)][0], "password": PASSWORD}))
+    results["GET /todos/"] = await run_scenario(requests, concurrency, lambda n: client.get(
+        "/todos/", headers=auth(n)))
+    results["GET /todos/done/{status}"] = await run_scenario(requests, concurrency, lambda n: client.get(
+        "/todos/done/true", headers=auth(n)))
+
+    # Todos created here are then patched, completed and deleted by the same user
+    created: Dict[int, int] = {}
+
+    async def create(number: int) -> httpx.Response:
+        response = await client.post(
+            "/todos/", json={"description": f"load {number}", "deadline": "2031-01-01T00:00:00"}, headers=auth(number))
+        if response.status_code < 400:
+            created[number] = response.json()["id"]
+        return response
+
+    results["POST /todos/"] = await run_scenario(requests, concurrency, create)
+    results["PATCH /todos/{id}"] = await run_scenario(requests, concurrency, lambda n: client.patch(
+        f"/todos/{created.get(n, 0)}", json={"description": f"patched {n}"}, headers=auth(n)))
+    results["PATCH /todos/{id}/complete"] = await run_scenario(requests, concurrency, lambda n: client.patch(
+        f"/todos/{created.get(n, 0)}/complete", headers=auth(n)))
+    results["DELETE /todos/{id}"] = await run_scenario(requests, concurrency, lambda n: client.delete(
+        f"/todos/{created.get(n, 0)}", headers=auth(n)))
+    return results
+
+
+async def websocket_scenarios(ws_url: str, accounts: List[Tuple[str, str]], clients: int, messages: int) -> Dict[str, dict]:
+    """Connect clients spread over the users, then time the broadcast of messages from one of them to the rest"""
+    connect_latencies: List[float] = []
+    connect_errors = 0
+    connections = []
+    started = time.perf_counter()
+    for i in range(clients):
+        connect_started = time.perf_counter()
+        try:
+            connection = await websockets.connect(f"{ws_url}/ws?token={accounts[i % len(accounts)][1]}")
+            await connection.recv()  # welcome
+        except (OSError, websockets.WebSocketException):
+            connect_errors += 1
+            continue
+        connect_latencies.append(time.perf_counter() - connect_started)
+        connections.append((i % len(accounts), connection))
+    results = {"WS /ws connect": summarize(connect_latencies, connect_errors, time.perf_counter() - started)}
+
+    # Broadcasts skip every connection of the sending user
+    (sender_user, sender), receivers = connections[0], [c for user, c in connections if user != connections[0][0]]
+    latencies: List[float] = []
+
+    async def receive(connection):
+        received = 0
+        while received < messages:
+            frame = json.loads(await connection.recv())
+            if frame.get("type") == "message":
+                latencies.append(time.perf_counter() - frame["message"]["sent"])
+                received += 1
+
+    async def drain(connection):
+        # Keep reading confirmations so the sender is not dropped as a slow client
+        while True:
+            await connection.recv()
+
+    drain_task = asyncio.create_task(drain(sender))
+    receive_tasks = [asyncio.create_task(receive(connection)) for connection in receivers]
+    started = time.perf_counter()
+    for i in range(messages):
+        await sender.send(json.dumps({"message": {"sent": time.perf_counter(), "n": i}}))
+    await asyncio.wait(receive_tasks, timeout=60)
+    elapsed = time.perf_counter() - started
+    for task in receive_tasks + [drain_task]:
+        task.cancel()
+    errors = messages * len(receivers) - len(latencies)
+    results["WS /ws broadcast delivery"] = summarize(latencies, errors, elapsed)
+
+    for _, connection in connections:
+        await connection.close()
+    return results
+
+
+async def main(args):
+    workdir = None
+    database_url = args.database_url
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix="todo-bench-")
+        database_url = f"sqlite:///{workdir}/bench.db"
+
+    port = free_port()
+    server = start_server(database_url, port)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client, server)
+            accounts = await seed(client, args.users, args.todos)
+            endpoints = await http_scenarios(client, accounts, args.requests, args.concurrency)
+        endpoints.update(await websocket_scenarios(f"ws://127.0.0.1:{port}", accounts, args.ws_clients, args.ws_messages))
+    finally:
+        server.terminate()
+        server.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "database": database_url.split(":", 1)[0],
+        "scale": {
+            "users": args.users,
+            "todos_per_user": args.todos,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "ws_clients": args.ws_clients,
+            "ws_messages": args.ws_messages,
+        },
+        "endpoints": endpoints,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load and latency benchmark of the API and WebSocket channel")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--todos", type=int, default=1000, help="todos seeded per user")
+    parser.add_argument("--requests", type=int, default=500, help="requests per HTTP endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ws-clients", type=int, default=50)
+    parser.add_argument("--ws-messages", type=int, default=20)
+    parser.add_argument("--database-url", help="DATABASE_URL of an existing database (default: scratch SQLite)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+
+# Benchmark of the todo list response path.
+# Compares the previous list_todos path (ORM Todo objects validated into TodoPage/TodoRead and encoded
+# with jsonable_encoder + the stdlib JSON encoder) with the current one (TodoRead columns selected as
+# plain rows and encoded with orjson), including the query, against an in-memory SQLite database.
+#
+# Usage: python -m benchmarks.serialization [--rows 500] [--repeat 200]
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Todo, TodoPage, User
+from app.helper.pagination import TodoOrder, build_page, paginate
+from app.helper.todo_queries import TODO_COLUMNS
+
+
+async def seed(engine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        db.add(User(id=1, name="bench", email="bench@example.com", password="x"))
+        start = datetime(2030, 1, 1)
+        db.add_all(
+            Todo(description=f"todo number {i}", deadline=start + timedelta(hours=i), done=i % 3 == 0, user_id=1)
+            for i in range(rows)
+        )
+        await db.commit()
+
+
+async def previous_path(db: AsyncSession, limit: int) -> bytes:
+    statement = select(Todo).where(Todo.user_id == 1).order_by(Todo.id).limit(limit + 1)
+    todos = (await db.exec(statement)).all()
+    page = TodoPage(items=todos[:limit], next_cursor=None)
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+async def current_path(db: AsyncSession, limit: int) -> bytes:
+    statement = paginate(select(*TODO_COLUMNS).where(Todo.user_id == 1), TodoOrder.id, None, limit)
+    rows = (await db.exec(statement)).all()
+    return orjson.dumps(build_page(rows, TodoOrder.id, limit))
+
+
+async def measure(engine, path, limit: int, repeat: int) -> float:
+    async with AsyncSession(engine) as db:
+        await path(db, limit)  # warm up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await path(db, limit)
+            db.expunge_all()
+        return (time.perf_counter() - started) / repeat
+
+
+async def main(rows: int, repeat: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    await seed(engine, rows)
+
+    async with AsyncSession(engine) as db:
+        # Both paths must produce the same document
+        assert orjson.loads(await previous_path(db, rows)) == orjson.loads(await current_path(db, rows))
+
+    previous = await measure(engine, previous_path, rows, repeat)
+    current = await measure(engine, current_path, rows, repeat)
+    print(f"page of {rows} todos, {repeat} runs each")
+    print(f"previous (ORM + pydantic + json): {previous * 1000:8.3f} ms/page")
+    print(f"current  (rows + orjson):         {current * 1000:8.3f} ms/page")
+    print(f"speedup: {previous / current:.2f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the todo list response path")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,140 @@
+# Open WebSocket sessions must not hold pooled database connections.
+
+import asyncio
+
+from fastapi import WebSocketDisconnect
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.websockets import WebSocketState
+
+from app.db.database import create_db_and_tables, engine
+from app.db.models import User
+from app.helper.auth import create_access_token
+from app.helper.broadcast import manager, websocket_endpoint
+
+SOCKETS = 1000
+
+
+class PoolCounter:
+    """Counts connections checked out of the engine's pool"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+
+    def on_checkout(self, *args):
+        self.checked_out += 1
+        self.checkouts += 1
+        self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def on_checkin(self, *args):
+        self.checked_out -= 1
+
+    def reset(self):
+        self.max_checked_out = self.checked_out
+        self.checkouts = 0
+
+
+class FakeWebSocket:
+    """Accepts everything the server sends and stays open until released"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.application_state = WebSocketState.CONNECTED
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        pass
+
+    async def receive_text(self) -> str:
+        await self.release.wait()
+        raise WebSocketDisconnect()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.application_state = WebSocketState.DISCONNECTED
+        self.release.set()
+
+
+async def wait_for_connections(count: int, poll_seconds: float = 0.01):
+    while manager.stats()["connections"] != count:
+        await asyncio.sleep(poll_seconds)
+
+
+def open_session(email: str):
+    websocket = FakeWebSocket()
+    return websocket, asyncio.create_task(websocket_endpoint(websocket, create_access_token({"sub": email})))
+
+
+async def open_sessions(emails):
+    sockets, tasks = zip(*(open_session(email) for email in emails))
+    await asyncio.wait_for(wait_for_connections(len(sockets)), 60)
+    return sockets, tasks
+
+
+async def open_sessions_one_by_one(emails):
+    """Each handshake finishes before the next starts, while the earlier sessions stay open"""
+    sockets, tasks = [], []
+    for email in emails:
+        websocket, task = open_session(email)
+        sockets.append(websocket)
+        tasks.append(task)
+        await asyncio.wait_for(wait_for_connections(len(sockets), 0), 60)
+    return sockets, tasks
+
+
+async def close_sessions(sockets, tasks):
+    for websocket in sockets:
+        websocket.release.set()
+    await asyncio.gather(*tasks)
+
+
+async def run_sessions(counter: PoolCounter) -> dict:
+    await create_db_and_tables()
+    emails = [f"ws-pool-{i}@example.com" for i in range(SOCKETS)]
+    async with AsyncSession(engine) as db:
+        db.add_all([User(name=f"ws-pool-{i}", email=email, password="x") for i, email in enumerate(emails)])
+        await db.commit()
+    await manager.start()
+    try:
+        results = {}
+
+        # Cold user cache: each handshake looks its user up once, then releases the connection
+        # A session that kept it would add one more checked out connection per socket
+        counter.reset()
+        sockets, tasks = await open_sessions_one_by_one(emails)
+        results["cold_handshake_checkouts"] = counter.checkouts
+        results["cold_max_checked_out"] = counter.max_checked_out
+        await asyncio.sleep(0.5)
+        results["open_checked_out"] = counter.checked_out
+        await close_sessions(sockets, tasks)
+
+        # Warm user cache: reconnecting authenticates without the database
+        counter.reset()
+        sockets, tasks = await open_sessions(emails)
+        await asyncio.sleep(0.5)
+        results["warm_max_checked_out"] = counter.max_checked_out
+        results["warm_open_checked_out"] = counter.checked_out
+        await close_sessions(sockets, tasks)
+        return results
+    finally:
+        await manager.stop()
+
+
+def test_open_websockets_hold_no_pooled_connections():
+    counter = PoolCounter()
+    event.listen(engine.sync_engine, "checkout", counter.on_checkout)
+    event.listen(engine.sync_engine, "checkin", counter.on_checkin)
+    try:
+        results = asyncio.run(run_sessions(counter))
+    finally:
+        event.remove(engine.sync_engine, "checkout", counter.on_checkout)
+        event.remove(engine.sync_engine, "checkin", counter.on_checkin)
+
+    assert results["cold_max_checked_out"] <= 1
+    assert results["open_checked_out"] <= 1
+    assert results["cold_handshake_checkouts"] <= SOCKETS
+    assert results["warm_max_checked_out"] <= 1
+    assert results["warm_open_checked_out"] <= 1